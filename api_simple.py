@@ -57,6 +57,12 @@ def init_db():
         )
     ''')
 
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_subs_testcode_time
+        ON online_submissions(test_code, submitted_at DESC)
+    ''')
+    cursor.execute('DROP INDEX IF EXISTS idx_subs_testcode')
+
     conn.commit()
     conn.close()
     print("✅ Database initialised")
@@ -177,12 +183,6 @@ class APIHandler(BaseHTTPRequestHandler):
                     data['time_taken']
                 ))
 
-                cursor.execute('''
-                    UPDATE online_tests
-                    SET total_submissions = total_submissions + 1
-                    WHERE test_code = ?
-                ''', (data['test_code'],))
-
                 conn.commit()
                 conn.close()
 
@@ -6,10 +6,14 @@ Main Streamlit application for RubriqAI.
 import streamlit as st
 import pandas as pd
 import json
-from evaluator import RubricEvaluator
-from prompts import build_prompt
+import orjson
+import asyncio
+import hashlib
+from evaluator import RubricEvaluator, stream_scores
+from prompts import build_prompt, build_model_answer_prompt
 from utils import (
     calculate_percentage,
+    get_performance_bucket,
     get_performance_label,
     get_performance_color,
     calculate_total_score,
@@ -103,8 +107,74 @@ st.markdown("""
 # ORIGINAL CODE CONTINUES BELOW
 # ============================================================================
 
-# Initialize evaluator
-evaluator = RubricEvaluator()
+# Initialize evaluators once per session; reruns reuse them.
+# Grading sets its mode on `evaluator`; the rubric and model-answer tools use their own,
+# which stays in the default (moderate) mode so a grading run's mode never leaks into them.
+if 'evaluator' not in st.session_state:
+    st.session_state.evaluator = RubricEvaluator()
+if 'tools_evaluator' not in st.session_state:
+    st.session_state.tools_evaluator = RubricEvaluator()
+evaluator = st.session_state.evaluator
+tools_evaluator = st.session_state.tools_evaluator
+
+
+@st.cache_data(persist="disk", show_spinner=False)
+def _gen_model_answer(question_text: str, rubric_formatted: str, temperature: float) -> str:
+    """Generate (and persist to disk) a model answer for one question + rubric."""
+    tools_evaluator.temperature = temperature
+    model_answer = tools_evaluator.evaluate(build_model_answer_prompt(question_text, rubric_formatted))
+    if model_answer.startswith('{"error"'):
+        # Raising keeps transient API failures out of the cache
+        raise RuntimeError(model_answer)
+    return model_answer
+
+
+def _render_model_answers_text(header: tuple, records: list) -> str:
+    """Render the model answer key as plain text."""
+    title, generated, rubric, marks_per_question, total_marks = header
+    head = f"""MODEL ANSWER KEY
+{title}
+Generated: {generated}
+
+{'='*80}
+
+RUBRIC:
+{rubric}
+
+Maximum marks per question: {marks_per_question}
+Total assignment marks: {total_marks}
+
+{'='*80}
+
+"""
+    body = "".join(
+        f"""
+QUESTION {q_num}:
+{q_text}
+
+MODEL ANSWER:
+{model_answer}
+
+Maximum Marks: {max_marks}
+
+{'-'*80}
+
+"""
+        for q_num, q_text, model_answer, max_marks in records
+    )
+    return head + body
+
+
+def _render_model_answers_md(header: tuple, records: list) -> str:
+    """Render the model answer key as Markdown."""
+    title, generated, rubric, marks_per_question, total_marks = header
+    head = f"""# Model Answer Key\n\n**{title}**  \n*Generated: {generated}*\n\n---\n\n## Rubric\n\n{rubric}\n\n**Maximum marks per question:** {marks_per_question}  \n**Total assignment marks:** {total_marks}\n\n---\n\n"""
+    body = "".join(
+        f"""## Question {q_num}\n\n**Question:** {q_text}\n\n**Model Answer:**\n\n{model_answer}\n\n**Maximum Marks:** {max_marks}\n\n---\n\n"""
+        for q_num, q_text, model_answer, max_marks in records
+    )
+    return head + body
+
 
 # Initialize database
 if 'db' not in st.session_state:
@@ -304,11 +374,10 @@ with st.sidebar:
             if st.button("✅ Import CSV", key="confirm_csv_import"):
                 if csv_title.strip():
                     try:
-                        csv_content = uploaded_file.read().decode('utf-8')
-                        
-                        # Import returns dict with assignment_id and students
+                        # Stream the upload; no decoded copy of the whole file is built
+                        uploaded_file.seek(0)
                         import_result = st.session_state.db.import_assignment_from_csv(
-                            csv_content, 
+                            uploaded_file, 
                             csv_title.strip()
                         )
                         
@@ -557,8 +626,8 @@ Chen,"Metabolic pathway transforms substrates through enzymatic catalysis. Compo
                         
                         # Show each student's evaluation
                         for eval_item in filtered_evals:
-                            perf_label = get_performance_label(eval_item['percentage'])
-                            perf_emoji = get_performance_emoji(perf_label)
+                            perf_bucket = get_performance_bucket(eval_item['percentage'])
+                            perf_emoji = get_performance_emoji(perf_bucket)
                             
                             with st.container():
                                 # Student summary row
@@ -924,8 +993,8 @@ else:
             
             # Generate rubric
             prompt = build_rubric_generation_prompt(questions)
-            evaluator.temperature = 0.3
-            result = evaluator.evaluate(prompt)
+            tools_evaluator.temperature = 0.3
+            result = tools_evaluator.evaluate(prompt)
             
             try:
                 # Parse JSON response
@@ -988,8 +1057,8 @@ else:
             
             # Analyze rubric
             prompt = build_rubric_analysis_prompt(questions, current_rubric)
-            evaluator.temperature = 0.3
-            result = evaluator.evaluate(prompt)
+            tools_evaluator.temperature = 0.3
+            result = tools_evaluator.evaluate(prompt)
             
             try:
                 # Parse JSON response
@@ -1256,8 +1325,24 @@ if st.button(button_text):
             # Build prompt and evaluate using evaluator module
             prompt = build_prompt(question, rubric_formatted, answer)
             
-            with st.spinner("🔄 Evaluating..."):
-                result = evaluator.evaluate(prompt)
+            # Stream the response so each criterion shows up as soon as the model finishes it
+            response_parts = []
+            
+            def _collect_response():
+                for piece in evaluator.evaluate_stream(prompt):
+                    response_parts.append(piece)
+                    yield piece
+            
+            with st.status("🔄 Evaluating...") as eval_status:
+                try:
+                    for score in stream_scores(_collect_response()):
+                        st.write(f"✓ {score.get('criterion', 'Criterion')}: {score.get('awarded', 0)}/{score.get('max', 0)}")
+                    result = "".join(response_parts)
+                    eval_status.update(label="✅ Evaluation complete", state="complete")
+                except Exception as e:
+                    # The connection dropped part-way through the response
+                    result = json.dumps({"error": f"API Error: {str(e)}"})
+                    eval_status.update(label="❌ Evaluation interrupted", state="error")
             
             # Store result in session state for display
             st.session_state.evaluation_result = result
@@ -1288,25 +1373,103 @@ if st.button(button_text):
             # Track all evaluations
             all_evaluations_saved = []
             
-            # Evaluate each student
+            # Collect every student's answered questions up front; each student's answers are
+            # packed into batch prompts and all students are evaluated concurrently.
+            # Questions already graded by an interrupted run of the same inputs are reused.
+            assignment_id = st.session_state.current_assignment_id
+            checkpoints = st.session_state.db.get_grading_checkpoints(assignment_id) if assignment_id else {}
+            rubric_formatted = st.session_state.assignment.format_rubric_for_evaluation()
+            response_by_key = {}
+            pending_keys = []
+            groups = []
+            for student_idx, student in enumerate(students):
+                keys = []
+                pairs = []
+                for q_data in st.session_state.assignment.questions:
+                    q_num = q_data['question_number']
+                    student_answer = student['answers'].get(q_num, "")
+                    if not student_answer:
+                        continue
+                    input_hash = hashlib.sha256(
+                        f"{mode}|{rubric_formatted}|{q_data['question_text']}|{student_answer}".encode()
+                    ).hexdigest()
+                    saved = checkpoints.get((student['student_name'], q_num))
+                    if saved and saved[0] == input_hash:
+                        response_by_key[(student_idx, q_num)] = saved[1]
+                    else:
+                        keys.append((student_idx, q_num, input_hash))
+                        pairs.append((q_data['question_text'], student_answer))
+                pending_keys.append(keys)
+                groups.append(pairs)
+            
+            if response_by_key:
+                st.info(f"♻️ Resuming: {len(response_by_key)} answers were already graded by an unfinished run.")
+            
+            def _update_progress(completed, total):
+                status_text.text(f"📝 Completed {completed}/{total} requests for {total_students} students...")
+                progress_bar.progress(completed / total)
+            
+            # Checkpoints and evaluations are written in batches of this many rows per transaction.
+            # A crash loses at most one unflushed batch of checkpoints, whose responses are
+            # still in the evaluator's response cache.
+            write_batch_size = 100
+            checkpoint_buffer = []
+            
+            def _flush_checkpoints():
+                if checkpoint_buffer:
+                    st.session_state.db.save_grading_checkpoints(checkpoint_buffer)
+                    checkpoint_buffer.clear()
+            
+            def _checkpoint_result(group_idx, pair_idx, response):
+                student_idx, q_num, input_hash = pending_keys[group_idx][pair_idx]
+                response_by_key[(student_idx, q_num)] = response
+                if assignment_id and not response.startswith('{"error"'):
+                    checkpoint_buffer.append(
+                        (assignment_id, students[student_idx]['student_name'], q_num, input_hash, response)
+                    )
+                    if len(checkpoint_buffer) >= write_batch_size:
+                        _flush_checkpoints()
+            
+            try:
+                grouped_responses = asyncio.run(evaluator.evaluate_many_batched(
+                    groups, rubric_formatted,
+                    progress_callback=_update_progress,
+                    result_callback=_checkpoint_result
+                ))
+            finally:
+                _flush_checkpoints()
+            for keys, responses in zip(pending_keys, grouped_responses):
+                for (student_idx, q_num, _), response in zip(keys, responses):
+                    response_by_key[(student_idx, q_num)] = response
+            
+            pending_saves = []  # (student_name, evaluation_data, summary) not yet written
+            
+            def _flush_evaluations():
+                if not pending_saves:
+                    return
+                try:
+                    eval_ids = st.session_state.db.save_evaluations(
+                        st.session_state.current_assignment_id,
+                        [(student_name, evaluation_data) for student_name, evaluation_data, _ in pending_saves]
+                    )
+                except Exception as e:
+                    names = ", ".join(student_name for student_name, _, _ in pending_saves)
+                    st.warning(f"Could not save evaluations for {names}: {str(e)}")
+                else:
+                    for eval_id, (_, _, summary) in zip(eval_ids, pending_saves):
+                        all_evaluations_saved.append({'eval_id': eval_id, **summary})
+                pending_saves.clear()
+            
+            # Assemble each student's results
             for student_idx, student in enumerate(students):
                 student_name = student['student_name']
-                student_answers = student['answers']  # Dict: {question_num: answer}
-                
-                status_text.text(f"📝 Evaluating {student_name}... ({student_idx + 1}/{total_students})")
-                progress_bar.progress(student_idx / total_students)
-                
-                # Evaluate all questions for this student
                 individual_results = []
                 
                 for q_data in st.session_state.assignment.questions:
                     q_num = q_data['question_number']
                     q_text = q_data['question_text']
                     
-                    # Get student's answer for this question
-                    student_answer = student_answers.get(q_num, "")
-                    
-                    if not student_answer:
+                    if (student_idx, q_num) not in response_by_key:
                         # No answer provided for this question
                         individual_results.append({
                             'question_number': q_num,
@@ -1315,16 +1478,11 @@ if st.button(button_text):
                         })
                         continue
                     
-                    # Format rubric
-                    rubric_formatted = st.session_state.assignment.format_rubric_for_evaluation()
-                    
-                    # Build prompt and evaluate
-                    prompt = build_prompt(q_text, rubric_formatted, student_answer)
-                    result = evaluator.evaluate(prompt)
+                    result = response_by_key[(student_idx, q_num)]
                     
                     # Parse result
                     try:
-                        parsed_result = json.loads(result)
+                        parsed_result = orjson.loads(result)
                         parsed_result['question_number'] = q_num
                         parsed_result['question_text'] = q_text
                         individual_results.append(parsed_result)
@@ -1339,30 +1497,25 @@ if st.button(button_text):
                 combined = combine_evaluation_results(individual_results)
                 percentage = calculate_percentage(combined['total_score'], combined['total_max'])
                 
-                # Auto-save this student's evaluation
+                # Auto-save this student's evaluation (written with the next batch)
                 if st.session_state.current_assignment_id:
-                    try:
-                        evaluation_data = {
-                            'total_score': combined['total_score'],
-                            'total_max': combined['total_max'],
-                            'percentage': percentage,
-                            'mode': mode,
-                            'individual_results': individual_results
-                        }
-                        eval_id = st.session_state.db.save_evaluation(
-                            st.session_state.current_assignment_id,
-                            evaluation_data,
-                            student_name=student_name
-                        )
-                        all_evaluations_saved.append({
-                            'eval_id': eval_id,
-                            'student_name': student_name,
-                            'score': combined['total_score'],
-                            'max': combined['total_max'],
-                            'percentage': percentage
-                        })
-                    except Exception as e:
-                        st.warning(f"Could not save evaluation for {student_name}: {str(e)}")
+                    evaluation_data = {
+                        'total_score': combined['total_score'],
+                        'total_max': combined['total_max'],
+                        'percentage': percentage,
+                        'mode': mode,
+                        'individual_results': individual_results
+                    }
+                    pending_saves.append((student_name, evaluation_data, {
+                        'student_name': student_name,
+                        'score': combined['total_score'],
+                        'max': combined['total_max'],
+                        'percentage': percentage
+                    }))
+                    if len(pending_saves) >= write_batch_size:
+                        _flush_evaluations()
+            
+            _flush_evaluations()
             
             # Complete
             progress_bar.progress(1.0)
@@ -1752,7 +1905,7 @@ if 'evaluation_result' in st.session_state and st.session_state.assignment_mode
     st.markdown("---")
     
     try:
-        parsed = json.loads(result)
+        parsed = orjson.loads(result)
         
         # Check for API errors
         if "error" in parsed:
@@ -1766,8 +1919,9 @@ if 'evaluation_result' in st.session_state and st.session_state.assignment_mode
             max_score = score_data["max"]
             
             percentage = calculate_percentage(total_score, max_score)
-            performance_label = get_performance_label(percentage)
-            performance_emoji = get_performance_emoji(performance_label)
+            performance_bucket = get_performance_bucket(percentage)
+            performance_label = performance_bucket.label
+            performance_emoji = get_performance_emoji(performance_bucket)
             
             # 🔢 Total Score with Progress Bar
             col1, col2, col3 = st.columns([2, 2, 1])
@@ -1802,8 +1956,9 @@ if 'evaluation_result' in st.session_state and st.session_state.assignment_mode
                     item['awarded'], 
                     item['max']
                 )
-                criterion_label = get_performance_label(criterion_percentage)
-                criterion_emoji = get_performance_emoji(criterion_label)
+                criterion_bucket = get_performance_bucket(criterion_percentage)
+                criterion_label = criterion_bucket.label
+                criterion_emoji = get_performance_emoji(criterion_bucket)
                 
                 with st.expander(
                     f"**{item['criterion']}** - {criterion_emoji} {format_score_display(item['awarded'], item['max'])} ({criterion_percentage}%)", 
@@ -1920,8 +2075,9 @@ if 'multi_evaluation_results' in st.session_state and st.session_state.assignmen
     total_score = combined['total_score']
     total_max = combined['total_max']
     percentage = calculate_percentage(total_score, total_max)
-    performance_label = get_performance_label(percentage)
-    performance_emoji = get_performance_emoji(performance_label)
+    performance_bucket = get_performance_bucket(percentage)
+    performance_label = performance_bucket.label
+    performance_emoji = get_performance_emoji(performance_bucket)
     
     # Overall Score Display
     st.markdown("### 🎯 Overall Performance")
@@ -1957,8 +2113,9 @@ if 'multi_evaluation_results' in st.session_state and st.session_state.assignmen
             # Calculate max for this question
             q_max = sum(item.get('max', 0) for item in result.get('scores', []))
             q_percentage = calculate_percentage(q_score, q_max)
-            q_label = get_performance_label(q_percentage)
-            q_emoji = get_performance_emoji(q_label)
+            q_bucket = get_performance_bucket(q_percentage)
+            q_label = q_bucket.label
+            q_emoji = get_performance_emoji(q_bucket)
             
             with st.expander(
                 f"**Question {q_num}** - {q_emoji} {format_score_display(q_score, q_max)} ({q_percentage}%)",
@@ -2021,15 +2178,16 @@ if st.session_state.assignment_mode == "multi" and st.session_state.assignment.g
     st.markdown("---")
     st.subheader("📚 Generate Model Answer Key")
     
-    if st.button("🎯 Generate", type="primary", use_container_width=True, key="generate_model_answers"):
+    # Form submit triggers exactly one rerun, so no explicit st.rerun() is needed
+    with st.form("gen_model_key"):
+        generate_submitted = st.form_submit_button("🎯 Generate", type="primary", use_container_width=True)
+
+    if generate_submitted:
         st.session_state.generate_model_key = True
-        st.rerun()
     
     # Generate and display model answers
     if st.session_state.get('generate_model_key', False):
         with st.spinner("🤖 Generating model answers..."):
-            from prompts import build_model_answer_prompt
-            
             model_answers = []
             progress_bar = st.progress(0)
             status_text = st.empty()
@@ -2045,12 +2203,12 @@ if st.session_state.assignment_mode == "multi" and st.session_state.assignment.g
                 # Format rubric
                 rubric_formatted = st.session_state.assignment.format_rubric_for_evaluation()
                 
-                # Build model answer prompt
-                prompt = build_model_answer_prompt(q_text, rubric_formatted)
-                
-                # Generate using evaluator (with moderate temperature for quality)
-                evaluator.temperature = 0.4  # Balanced for quality answers
-                model_answer = evaluator.evaluate(prompt)
+                # Generate using evaluator (with moderate temperature for quality).
+                # Cached on (question, rubric, temperature) so repeat clicks skip the LLM.
+                try:
+                    model_answer = _gen_model_answer(q_text, rubric_formatted, 0.4)
+                except RuntimeError as e:
+                    model_answer = str(e)
                 
                 model_answers.append({
                     'question_number': q_num,
@@ -2072,36 +2230,21 @@ if st.session_state.assignment_mode == "multi" and st.session_state.assignment.g
             # Download button
             st.markdown("### 📥 Download Options")
             
-            # Create formatted document
-            doc_content = f"""MODEL ANSWER KEY
-{st.session_state.assignment.assignment_title or 'Assignment'}
-Generated: {datetime.now().strftime('%Y-%m-%d %H:%M')}
-
-{'='*80}
-
-RUBRIC:
-{st.session_state.assignment.format_rubric_for_evaluation()}
-
-Maximum marks per question: {st.session_state.assignment.max_marks_per_question}
-Total assignment marks: {st.session_state.assignment.get_total_marks()}
-
-{'='*80}
-
-"""
-            
-            for ans in st.session_state.model_answers:
-                doc_content += f"""
-QUESTION {ans['question_number']}:
-{ans['question_text']}
-
-MODEL ANSWER:
-{ans['model_answer']}
-
-Maximum Marks: {ans['max_marks']}
-
-{'-'*80}
-
-"""
+            # Walk the answer list once; both renderers share the records
+            assignment = st.session_state.assignment
+            header = (
+                assignment.assignment_title or 'Assignment',
+                datetime.now().strftime('%Y-%m-%d %H:%M'),
+                assignment.format_rubric_for_evaluation(),
+                assignment.max_marks_per_question,
+                assignment.get_total_marks()
+            )
+            records = [
+                (a['question_number'], a['question_text'], a['model_answer'], a['max_marks'])
+                for a in st.session_state.model_answers
+            ]
+            doc_content = _render_model_answers_text(header, records)
+            md_content = _render_model_answers_md(header, records)
             
             # Download as text file
             col1, col2 = st.columns(2)
@@ -2116,11 +2259,6 @@ Maximum Marks: {ans['max_marks']}
             
             with col2:
                 # Download as markdown
-                md_content = f"""# Model Answer Key\n\n**{st.session_state.assignment.assignment_title or 'Assignment'}**  \n*Generated: {datetime.now().strftime('%Y-%m-%d %H:%M')}*\n\n---\n\n## Rubric\n\n{st.session_state.assignment.format_rubric_for_evaluation()}\n\n**Maximum marks per question:** {st.session_state.assignment.max_marks_per_question}  \n**Total assignment marks:** {st.session_state.assignment.get_total_marks()}\n\n---\n\n"""
-                
-                for ans in st.session_state.model_answers:
-                    md_content += f"""## Question {ans['question_number']}\n\n**Question:** {ans['question_text']}\n\n**Model Answer:**\n\n{ans['model_answer']}\n\n**Maximum Marks:** {ans['max_marks']}\n\n---\n\n"""
-                
                 st.download_button(
                     "📝 Download as Markdown",
                     data=md_content,
@@ -3,12 +3,155 @@ database.py
 SQLite database integration for RubriqAI - handles persistence of assignments and evaluations.
 """
 
+import re
+import csv
+import codecs
 import sqlite3
-import json
+import threading
+import orjson
+import zstandard
 import pandas as pd
 from datetime import datetime
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional, Tuple, Union, BinaryIO
 from contextlib import contextmanager
+from functools import lru_cache
+from io import StringIO
+
+
+# Evaluation results are stored as zstd-compressed JSON in evaluations.results_blob.
+# zstd contexts are not thread-safe and each Streamlit session runs on its own thread
+# with its own Database, so every thread gets its own pair.
+_ZSTD_CONTEXTS = threading.local()
+
+
+def _zstd_compressor() -> zstandard.ZstdCompressor:
+    """This thread's zstd compressor."""
+    compressor = getattr(_ZSTD_CONTEXTS, 'compressor', None)
+    if compressor is None:
+        compressor = _ZSTD_CONTEXTS.compressor = zstandard.ZstdCompressor(level=3)
+    return compressor
+
+
+def _zstd_decompressor() -> zstandard.ZstdDecompressor:
+    """This thread's zstd decompressor."""
+    decompressor = getattr(_ZSTD_CONTEXTS, 'decompressor', None)
+    if decompressor is None:
+        decompressor = _ZSTD_CONTEXTS.decompressor = zstandard.ZstdDecompressor()
+    return decompressor
+
+
+# First-cell values that start a new section in an imported assignment CSV
+_CSV_SECTION_MARKERS = {
+    'QUESTIONS': 'questions',
+    'QUESTION': 'questions',
+    'STUDENTS': 'students',
+    'STUDENT': 'students',
+    'ANSWERS': 'students',
+}
+
+
+# ===== SQL STATEMENTS =====
+# Kept as module constants so every call passes the identical string and hits
+# the connection's prepared-statement cache.
+
+_EVALUATION_COLUMNS = """
+    id, student_name, evaluated_at, total_score, max_score,
+    percentage, evaluation_mode, results_json, results_blob
+"""
+
+_SQL_INSERT_ASSIGNMENT = """
+    INSERT INTO assignments (title, total_questions, max_marks_per_question, total_marks, assignment_type)
+    VALUES (?, ?, ?, ?, ?)
+    RETURNING id
+"""
+_SQL_INSERT_QUESTION = """
+    INSERT INTO questions (assignment_id, question_number, question_text)
+    VALUES (?, ?, ?)
+"""
+_SQL_INSERT_RUBRIC = """
+    INSERT INTO rubrics (assignment_id, criteria, total_marks)
+    VALUES (?, ?, ?)
+"""
+# Assignment row plus its questions and rubric as JSON arrays, in one round-trip
+_SQL_LOAD_ASSIGNMENT = """
+    SELECT a.title, a.max_marks_per_question, a.total_marks,
+           (SELECT json_group_array(json_object('question_number', question_number,
+                                                'question_text', question_text))
+            FROM (SELECT question_number, question_text FROM questions
+                  WHERE assignment_id = a.id ORDER BY question_number)) AS questions_json,
+           (SELECT json_group_array(json_object('CRITERIA', criteria, 'TOTAL MARKS', total_marks))
+            FROM (SELECT criteria, total_marks FROM rubrics
+                  WHERE assignment_id = a.id ORDER BY id)) AS rubric_json
+    FROM assignments a
+    WHERE a.id = ?
+"""
+_SQL_SELECT_ALL_ASSIGNMENTS = """
+    SELECT id, title, created_at, total_questions, total_marks, assignment_type
+    FROM assignments
+    ORDER BY created_at DESC
+"""
+_SQL_DELETE_ASSIGNMENT = "DELETE FROM assignments WHERE id = ?"
+_SQL_RENAME_ASSIGNMENT = "UPDATE assignments SET title = ? WHERE id = ?"
+_SQL_DELETE_ALL_ASSIGNMENTS = "DELETE FROM assignments"
+
+_SQL_INSERT_EVALUATION = """
+    INSERT INTO evaluations
+    (assignment_id, student_name, total_score, max_score, percentage, evaluation_mode,
+     results_json, results_blob)
+    VALUES (?, ?, ?, ?, ?, ?, '', ?)
+    RETURNING id
+"""
+_SQL_SELECT_EVALUATIONS_BY_ASSIGNMENT = f"""
+    SELECT {_EVALUATION_COLUMNS}
+    FROM evaluations
+    WHERE assignment_id = ?
+    ORDER BY evaluated_at DESC
+"""
+_SQL_SEARCH_EVALUATIONS_BY_STUDENT = """
+    SELECT e.id, e.student_name, e.evaluated_at, e.total_score, e.max_score,
+           e.percentage, e.evaluation_mode, e.results_json, e.results_blob
+    FROM evaluations e
+    JOIN evaluations_fts f ON f.rowid = e.id
+    WHERE evaluations_fts MATCH ? AND e.assignment_id = ?
+    ORDER BY e.evaluated_at DESC
+"""
+_SQL_SELECT_RECENT_EVALUATIONS = """
+    SELECT e.id, e.assignment_id, a.title, e.student_name, e.evaluated_at,
+           e.total_score, e.max_score, e.percentage, e.evaluation_mode
+    FROM evaluations e
+    JOIN assignments a ON e.assignment_id = a.id
+    ORDER BY e.evaluated_at DESC
+    LIMIT ?
+"""
+_SQL_DELETE_EVALUATION = "DELETE FROM evaluations WHERE id = ?"
+_SQL_RENAME_EVALUATION_STUDENT = "UPDATE evaluations SET student_name = ? WHERE id = ?"
+_SQL_DELETE_EVALUATIONS_BY_ASSIGNMENT = "DELETE FROM evaluations WHERE assignment_id = ?"
+_SQL_DELETE_ALL_EVALUATIONS = "DELETE FROM evaluations"
+_SQL_EXPORT_EVALUATIONS = """
+    SELECT {columns}, a.title as assignment_title
+    FROM evaluations e
+    JOIN assignments a ON e.assignment_id = a.id
+    {where}
+    ORDER BY e.evaluated_at DESC
+"""
+
+_SQL_SAVE_GRADING_CHECKPOINT = """
+    INSERT OR REPLACE INTO grading_checkpoints
+    (assignment_id, student_name, question_number, input_hash, response_json)
+    VALUES (?, ?, ?, ?, ?)
+"""
+_SQL_SELECT_GRADING_CHECKPOINTS = """
+    SELECT student_name, question_number, input_hash, response_json
+    FROM grading_checkpoints
+    WHERE assignment_id = ?
+"""
+_SQL_CLEAR_GRADING_CHECKPOINTS = "DELETE FROM grading_checkpoints WHERE assignment_id = ? AND student_name = ?"
+
+_SQL_ASSIGNMENT_STATISTICS = """
+    SELECT total_evaluations, sum_percentage, min_percentage, max_percentage, sum_score
+    FROM assignment_stats
+    WHERE assignment_id = ?
+"""
 
 
 class Database:
@@ -16,24 +159,76 @@ class Database:
     Manages SQLite database for storing assignments, questions, rubrics, and evaluations.
     """
     
+    # Connection PRAGMAs (applied once to the long-lived connection)
+    CONNECTION_PRAGMAS = (
+        "PRAGMA journal_mode=WAL",     # Persistent on the file; readers don't block writers
+        "PRAGMA synchronous=NORMAL",   # Safe with WAL, avoids an fsync per commit
+        "PRAGMA temp_store=MEMORY",
+        "PRAGMA cache_size=-64000",    # ~64MB page cache
+        "PRAGMA mmap_size=268435456",  # 256MB memory-mapped I/O
+        "PRAGMA busy_timeout=5000",    # Wait up to 5s on a locked database
+        "PRAGMA foreign_keys=ON",      # Enforce ON DELETE CASCADE for questions/rubrics/evaluations
+    )
+    
+    # Applied for the duration of a bulk import so the batch stays in memory until COMMIT
+    BULK_IMPORT_PRAGMAS = (
+        "PRAGMA cache_spill=0",
+        "PRAGMA cache_size=-262144",   # ~256MB page cache
+    )
+    BULK_IMPORT_RESTORE_PRAGMAS = (
+        "PRAGMA cache_spill=1",
+        "PRAGMA cache_size=-64000",
+    )
+    
     def __init__(self, db_path: str = "rubriqai.db"):
         """Initialize database connection and create tables if needed."""
         self.db_path = db_path
+        # One connection per Database instance keeps the page cache warm between calls.
+        # Streamlit may rerun a session on a different thread, so access is serialized by a lock.
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None,
+                                     cached_statements=256)
+        # Rows come back as plain tuples; readers unpack them positionally
+        for pragma in self.CONNECTION_PRAGMAS:
+            self._conn.execute(pragma)
+        # Assignment rows are cached per (id, local write count, PRAGMA data_version);
+        # data_version changes whenever another connection commits to the file.
+        self._assignments_version = 0
+        self._load_assignment_row = lru_cache(maxsize=128)(self._load_assignment_impl)
         self.init_database()
     
     @contextmanager
     def get_connection(self):
-        """Context manager for database connections."""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row  # Enable column access by name
-        try:
-            yield conn
-            conn.commit()
-        except Exception as e:
-            conn.rollback()
-            raise e
-        finally:
-            conn.close()
+        """Context manager yielding the shared connection inside a transaction."""
+        with self._lock:
+            conn = self._conn
+            conn.execute("BEGIN")
+            try:
+                yield conn
+                if conn.in_transaction:
+                    conn.execute("COMMIT")
+            except Exception as e:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise e
+    
+    @contextmanager
+    def _bulk_import(self):
+        """Context manager that keeps dirty pages in RAM while importing a large batch."""
+        with self._lock:
+            for pragma in self.BULK_IMPORT_PRAGMAS:
+                self._conn.execute(pragma)
+            try:
+                yield
+            finally:
+                for pragma in self.BULK_IMPORT_RESTORE_PRAGMAS:
+                    self._conn.execute(pragma)
+    
+    def close(self):
+        """Close the shared connection."""
+        with self._lock:
+            self._conn.execute("PRAGMA optimize")  # Refresh planner stats before shutdown
+            self._conn.close()
     
     def init_database(self):
         """Create database tables if they don't exist."""
@@ -87,11 +282,132 @@ class Database:
                     percentage REAL NOT NULL,
                     evaluation_mode TEXT NOT NULL,
                     results_json TEXT NOT NULL,
+                    results_blob BLOB,
                     FOREIGN KEY (assignment_id) REFERENCES assignments(id) ON DELETE CASCADE
                 )
             """)
             
-            conn.commit()
+            # Migrate older databases: add results_blob and compress any plain-text results once
+            cursor.execute("PRAGMA table_info(evaluations)")
+            if 'results_blob' not in {row[1] for row in cursor.fetchall()}:
+                cursor.execute("ALTER TABLE evaluations ADD COLUMN results_blob BLOB")
+            cursor.execute("SELECT id, results_json FROM evaluations WHERE results_blob IS NULL")
+            legacy_rows = [
+                (_zstd_compressor().compress(results_json.encode('utf-8')), eval_id)
+                for eval_id, results_json in cursor.fetchall()
+            ]
+            if legacy_rows:
+                cursor.executemany(
+                    "UPDATE evaluations SET results_blob = ?, results_json = '' WHERE id = ?",
+                    legacy_rows
+                )
+            
+            # Full-text index over student names, kept in sync with evaluations by triggers
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'evaluations_fts'")
+            fts_exists = cursor.fetchone() is not None
+            cursor.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS evaluations_fts USING fts5(
+                    student_name,
+                    content='evaluations',
+                    content_rowid='id',
+                    tokenize='unicode61'
+                )
+            """)
+            cursor.execute("""
+                CREATE TRIGGER IF NOT EXISTS evaluations_fts_ai AFTER INSERT ON evaluations BEGIN
+                    INSERT INTO evaluations_fts(rowid, student_name) VALUES (new.id, new.student_name);
+                END
+            """)
+            cursor.execute("""
+                CREATE TRIGGER IF NOT EXISTS evaluations_fts_ad AFTER DELETE ON evaluations BEGIN
+                    INSERT INTO evaluations_fts(evaluations_fts, rowid, student_name)
+                    VALUES ('delete', old.id, old.student_name);
+                END
+            """)
+            cursor.execute("""
+                CREATE TRIGGER IF NOT EXISTS evaluations_fts_au AFTER UPDATE OF student_name ON evaluations BEGIN
+                    INSERT INTO evaluations_fts(evaluations_fts, rowid, student_name)
+                    VALUES ('delete', old.id, old.student_name);
+                    INSERT INTO evaluations_fts(rowid, student_name) VALUES (new.id, new.student_name);
+                END
+            """)
+            if not fts_exists:
+                # Index evaluations saved before the FTS table existed
+                cursor.execute("INSERT INTO evaluations_fts(evaluations_fts) VALUES ('rebuild')")
+            
+            # Per-question results of an in-progress batch grading run, so a crashed run can resume
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS grading_checkpoints (
+                    assignment_id INTEGER NOT NULL,
+                    student_name TEXT NOT NULL,
+                    question_number INTEGER NOT NULL,
+                    input_hash TEXT NOT NULL,
+                    response_json TEXT NOT NULL,
+                    PRIMARY KEY (assignment_id, student_name, question_number),
+                    FOREIGN KEY (assignment_id) REFERENCES assignments(id) ON DELETE CASCADE
+                )
+            """)
+            
+            # Indexes for the per-assignment and most-recent lookups
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_eval_assign_date ON evaluations(assignment_id, evaluated_at DESC)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_eval_date ON evaluations(evaluated_at DESC)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_q_assign ON questions(assignment_id)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_rub_assign ON rubrics(assignment_id)")
+            
+            # Covering index for get_assignment_statistics, so the aggregates never read table rows
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_eval_assignment'")
+            stats_index_exists = cursor.fetchone() is not None
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_eval_assignment ON evaluations(assignment_id, percentage, total_score)")
+            if not stats_index_exists:
+                # Give the planner statistics for the new index straight away
+                cursor.execute("ANALYZE evaluations")
+            
+            # Running per-assignment totals, maintained by triggers so statistics are a single-row read.
+            # Deletes re-read MIN/MAX through idx_eval_assignment, which is a bounded index seek.
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'assignment_stats'")
+            stats_exists = cursor.fetchone() is not None
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS assignment_stats (
+                    assignment_id INTEGER PRIMARY KEY,
+                    total_evaluations INTEGER NOT NULL,
+                    sum_percentage REAL NOT NULL,
+                    min_percentage REAL NOT NULL,
+                    max_percentage REAL NOT NULL,
+                    sum_score REAL NOT NULL
+                )
+            """)
+            cursor.execute("""
+                CREATE TRIGGER IF NOT EXISTS assignment_stats_ai AFTER INSERT ON evaluations BEGIN
+                    INSERT INTO assignment_stats VALUES
+                        (new.assignment_id, 1, new.percentage, new.percentage, new.percentage, new.total_score)
+                    ON CONFLICT(assignment_id) DO UPDATE SET
+                        total_evaluations = total_evaluations + 1,
+                        sum_percentage = sum_percentage + excluded.sum_percentage,
+                        min_percentage = MIN(min_percentage, excluded.min_percentage),
+                        max_percentage = MAX(max_percentage, excluded.max_percentage),
+                        sum_score = sum_score + excluded.sum_score;
+                END
+            """)
+            cursor.execute("""
+                CREATE TRIGGER IF NOT EXISTS assignment_stats_ad AFTER DELETE ON evaluations BEGIN
+                    UPDATE assignment_stats SET
+                        total_evaluations = total_evaluations - 1,
+                        sum_percentage = sum_percentage - old.percentage,
+                        min_percentage = COALESCE((SELECT MIN(percentage) FROM evaluations WHERE assignment_id = old.assignment_id), 0),
+                        max_percentage = COALESCE((SELECT MAX(percentage) FROM evaluations WHERE assignment_id = old.assignment_id), 0),
+                        sum_score = sum_score - old.total_score
+                    WHERE assignment_id = old.assignment_id;
+                    DELETE FROM assignment_stats WHERE assignment_id = old.assignment_id AND total_evaluations <= 0;
+                END
+            """)
+            if not stats_exists:
+                # Seed totals for evaluations saved before the table existed
+                cursor.execute("""
+                    INSERT INTO assignment_stats
+                    SELECT assignment_id, COUNT(*), SUM(percentage), MIN(percentage), MAX(percentage), SUM(total_score)
+                    FROM evaluations
+                    GROUP BY assignment_id
+                """)
     
     # ===== ASSIGNMENT OPERATIONS =====
     
@@ -108,38 +424,34 @@ class Database:
         with self.get_connection() as conn:
             cursor = conn.cursor()
             
+            self._assignments_version += 1
+            
             # Determine assignment type
             assignment_type = "multi" if assignment_data.get('questions') else "single"
             
             # Insert assignment
-            cursor.execute("""
-                INSERT INTO assignments (title, total_questions, max_marks_per_question, total_marks, assignment_type)
-                VALUES (?, ?, ?, ?, ?)
-            """, (
+            assignment_id = cursor.execute(_SQL_INSERT_ASSIGNMENT, (
                 assignment_data.get('title', 'Untitled Assignment'),
                 len(assignment_data.get('questions', [])),
                 assignment_data.get('max_marks_per_question', 0),
                 assignment_data.get('total_marks', 0),
                 assignment_type
-            ))
-            
-            assignment_id = cursor.lastrowid
+            )).fetchone()[0]
             
             # Insert questions
-            for question in assignment_data.get('questions', []):
-                cursor.execute("""
-                    INSERT INTO questions (assignment_id, question_number, question_text)
-                    VALUES (?, ?, ?)
-                """, (assignment_id, question['question_number'], question['question_text']))
+            question_rows = [
+                (assignment_id, question['question_number'], question['question_text'])
+                for question in assignment_data.get('questions', [])
+            ]
+            cursor.executemany(_SQL_INSERT_QUESTION, question_rows)
             
             # Insert rubric
-            for rubric_item in assignment_data.get('rubric', []):
-                cursor.execute("""
-                    INSERT INTO rubrics (assignment_id, criteria, total_marks)
-                    VALUES (?, ?, ?)
-                """, (assignment_id, rubric_item['CRITERIA'], rubric_item['TOTAL MARKS']))
+            rubric_rows = [
+                (assignment_id, rubric_item['CRITERIA'], rubric_item['TOTAL MARKS'])
+                for rubric_item in assignment_data.get('rubric', [])
+            ]
+            cursor.executemany(_SQL_INSERT_RUBRIC, rubric_rows)
             
-            conn.commit()
             return assignment_id
     
     def load_assignment(self, assignment_id: int) -> Optional[Dict]:
@@ -152,52 +464,31 @@ class Database:
         Returns:
             Dict: Assignment data compatible with MultiQuestionAssignment.from_dict()
         """
+        with self._lock:
+            data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            assignment = self._load_assignment_row(assignment_id, self._assignments_version, data_version)
+        
+        if not assignment:
+            return None
+        
+        # The cached row holds the raw JSON, so every caller gets fresh, mutable lists
+        title, max_marks_per_question, total_marks, questions_json, rubric_json = assignment
+        return {
+            'title': title,
+            'questions': orjson.loads(questions_json),
+            'rubric': orjson.loads(rubric_json),
+            'max_marks_per_question': max_marks_per_question,
+            'total_marks': total_marks
+        }
+    
+    def _load_assignment_impl(self, assignment_id: int, assignments_version: int,
+                              data_version: int) -> Optional[Tuple]:
+        """Fetch the raw assignment row; the version arguments only serve as cache keys."""
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            
-            # Get assignment
-            cursor.execute("SELECT * FROM assignments WHERE id = ?", (assignment_id,))
-            assignment = cursor.fetchone()
-            
-            if not assignment:
-                return None
-            
-            # Get questions
-            cursor.execute("""
-                SELECT question_number, question_text 
-                FROM questions 
-                WHERE assignment_id = ? 
-                ORDER BY question_number
-            """, (assignment_id,))
-            questions = [
-                {
-                    'question_number': row['question_number'],
-                    'question_text': row['question_text']
-                }
-                for row in cursor.fetchall()
-            ]
-            
-            # Get rubric
-            cursor.execute("""
-                SELECT criteria, total_marks 
-                FROM rubrics 
-                WHERE assignment_id = ?
-            """, (assignment_id,))
-            rubric = [
-                {
-                    'CRITERIA': row['criteria'],
-                    'TOTAL MARKS': row['total_marks']
-                }
-                for row in cursor.fetchall()
-            ]
-            
-            return {
-                'title': assignment['title'],
-                'questions': questions,
-                'rubric': rubric,
-                'max_marks_per_question': assignment['max_marks_per_question'],
-                'total_marks': assignment['total_marks']
-            }
+            cursor.execute(_SQL_LOAD_ASSIGNMENT, (assignment_id,))
+            row = cursor.fetchone()
+            return row
     
     def get_all_assignments(self) -> List[Dict]:
         """
@@ -208,22 +499,19 @@ class Database:
         """
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("""
-                SELECT id, title, created_at, total_questions, total_marks, assignment_type
-                FROM assignments 
-                ORDER BY created_at DESC
-            """)
+            cursor.execute(_SQL_SELECT_ALL_ASSIGNMENTS)
             
             return [
                 {
-                    'id': row['id'],
-                    'title': row['title'],
-                    'created_at': row['created_at'],
-                    'total_questions': row['total_questions'],
-                    'total_marks': row['total_marks'],
-                    'assignment_type': row['assignment_type']
+                    'id': assignment_id,
+                    'title': title,
+                    'created_at': created_at,
+                    'total_questions': total_questions,
+                    'total_marks': total_marks,
+                    'assignment_type': assignment_type
                 }
-                for row in cursor.fetchall()
+                for (assignment_id, title, created_at, total_questions,
+                     total_marks, assignment_type) in cursor.fetchall()
             ]
     
     def delete_assignment(self, assignment_id: int) -> bool:
@@ -238,7 +526,8 @@ class Database:
         """
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("DELETE FROM assignments WHERE id = ?", (assignment_id,))
+            self._assignments_version += 1
+            cursor.execute(_SQL_DELETE_ASSIGNMENT, (assignment_id,))
             return cursor.rowcount > 0
     
     def rename_assignment(self, assignment_id: int, new_title: str) -> bool:
@@ -254,10 +543,8 @@ class Database:
         """
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute(
-                "UPDATE assignments SET title = ? WHERE id = ?",
-                (new_title, assignment_id)
-            )
+            self._assignments_version += 1
+            cursor.execute(_SQL_RENAME_ASSIGNMENT, (new_title, assignment_id))
             return cursor.rowcount > 0
     
     def delete_all_assignments(self) -> int:
@@ -269,13 +556,27 @@ class Database:
         """
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("SELECT COUNT(*) FROM assignments")
-            count = cursor.fetchone()[0]
-            cursor.execute("DELETE FROM assignments")
-            return count
+            self._assignments_version += 1
+            cursor.execute(_SQL_DELETE_ALL_ASSIGNMENTS)
+            return cursor.rowcount
     
     # ===== EVALUATION OPERATIONS =====
     
+    @staticmethod
+    def _evaluation_params(assignment_id: int, evaluation_data: Dict, student_name: str) -> tuple:
+        """Parameters for _SQL_INSERT_EVALUATION (results stored as zstd-compressed JSON)."""
+        return (
+            assignment_id,
+            student_name,
+            evaluation_data.get('total_score', 0),
+            evaluation_data.get('total_max', 0),
+            evaluation_data.get('percentage', 0),
+            evaluation_data.get('mode', 'moderate'),
+            _zstd_compressor().compress(
+                orjson.dumps(evaluation_data, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+            )
+        )
+    
     def save_evaluation(self, assignment_id: int, evaluation_data: Dict, student_name: str = "Anonymous") -> int:
         """
         Save evaluation result to database.
@@ -291,21 +592,39 @@ class Database:
         with self.get_connection() as conn:
             cursor = conn.cursor()
             
-            cursor.execute("""
-                INSERT INTO evaluations 
-                (assignment_id, student_name, total_score, max_score, percentage, evaluation_mode, results_json)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (
-                assignment_id,
-                student_name,
-                evaluation_data.get('total_score', 0),
-                evaluation_data.get('total_max', 0),
-                evaluation_data.get('percentage', 0),
-                evaluation_data.get('mode', 'moderate'),
-                json.dumps(evaluation_data)
-            ))
-            
-            return cursor.lastrowid
+            evaluation_id = cursor.execute(
+                _SQL_INSERT_EVALUATION, self._evaluation_params(assignment_id, evaluation_data, student_name)
+            ).fetchone()[0]
+            
+            return evaluation_id
+    
+    def save_evaluations(self, assignment_id: int, evaluations: List[Tuple[str, Dict]]) -> List[int]:
+        """
+        Save several students' evaluations in one transaction and drop their grading checkpoints.
+        
+        Args:
+            assignment_id: Assignment ID
+            evaluations: (student_name, evaluation_data) pairs
+            
+        Returns:
+            List[int]: Evaluation IDs, in the same order as evaluations
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            
+            # One statement per row, since the new IDs come back through RETURNING
+            evaluation_ids = [
+                cursor.execute(
+                    _SQL_INSERT_EVALUATION, self._evaluation_params(assignment_id, evaluation_data, student_name)
+                ).fetchone()[0]
+                for student_name, evaluation_data in evaluations
+            ]
+            cursor.executemany(
+                _SQL_CLEAR_GRADING_CHECKPOINTS,
+                [(assignment_id, student_name) for student_name, _ in evaluations]
+            )
+            
+            return evaluation_ids
     
     def get_evaluations_by_assignment(self, assignment_id: int) -> List[Dict]:
         """
@@ -319,25 +638,9 @@ class Database:
         """
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("""
-                SELECT * FROM evaluations 
-                WHERE assignment_id = ? 
-                ORDER BY evaluated_at DESC
-            """, (assignment_id,))
+            cursor.execute(_SQL_SELECT_EVALUATIONS_BY_ASSIGNMENT, (assignment_id,))
             
-            return [
-                {
-                    'id': row['id'],
-                    'student_name': row['student_name'],
-                    'evaluated_at': row['evaluated_at'],
-                    'total_score': row['total_score'],
-                    'max_score': row['max_score'],
-                    'percentage': row['percentage'],
-                    'evaluation_mode': row['evaluation_mode'],
-                    'results_json': json.loads(row['results_json'])
-                }
-                for row in cursor.fetchall()
-            ]
+            return self._rows_to_evaluations(cursor.fetchall())
     
     def search_evaluations_by_student(self, assignment_id: int, student_name: str) -> List[Dict]:
         """
@@ -345,32 +648,47 @@ class Database:
         
         Args:
             assignment_id: Assignment ID
-            student_name: Student name to search for (partial match)
+            student_name: Student name to search for (each word matched as a prefix)
             
         Returns:
             List[Dict]: Matching evaluations
         """
+        # Quote every word so user input can't inject FTS5 query syntax
+        tokens = re.findall(r"\w+", student_name)
+        if not tokens:
+            return self.get_evaluations_by_assignment(assignment_id)
+        match_query = " ".join(f'"{token}"*' for token in tokens)
+        
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("""
-                SELECT * FROM evaluations 
-                WHERE assignment_id = ? AND student_name LIKE ?
-                ORDER BY evaluated_at DESC
-            """, (assignment_id, f"%{student_name}%"))
+            cursor.execute(_SQL_SEARCH_EVALUATIONS_BY_STUDENT, (match_query, assignment_id))
             
-            return [
-                {
-                    'id': row['id'],
-                    'student_name': row['student_name'],
-                    'evaluated_at': row['evaluated_at'],
-                    'total_score': row['total_score'],
-                    'max_score': row['max_score'],
-                    'percentage': row['percentage'],
-                    'evaluation_mode': row['evaluation_mode'],
-                    'results_json': json.loads(row['results_json'])
-                }
-                for row in cursor.fetchall()
-            ]
+            return self._rows_to_evaluations(cursor.fetchall())
+    
+    @staticmethod
+    def _rows_to_evaluations(rows) -> List[Dict]:
+        """Build evaluation dicts from rows selected in the column order used above."""
+        return [
+            {
+                'id': eval_id,
+                'student_name': student_name,
+                'evaluated_at': evaluated_at,
+                'total_score': total_score,
+                'max_score': max_score,
+                'percentage': percentage,
+                'evaluation_mode': evaluation_mode,
+                'results_json': Database._decode_results(results_json, results_blob)
+            }
+            for (eval_id, student_name, evaluated_at, total_score, max_score,
+                 percentage, evaluation_mode, results_json, results_blob) in rows
+        ]
+    
+    @staticmethod
+    def _decode_results(results_json: str, results_blob: Optional[bytes]) -> Dict:
+        """Decode evaluation results from the compressed blob (or legacy JSON text)."""
+        if results_blob is not None:
+            return orjson.loads(_zstd_decompressor().decompress(results_blob))
+        return orjson.loads(results_json)
     
     def get_recent_evaluations(self, limit: int = 10) -> List[Dict]:
         """
@@ -384,34 +702,29 @@ class Database:
         """
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("""
-                SELECT e.*, a.title as assignment_title
-                FROM evaluations e
-                JOIN assignments a ON e.assignment_id = a.id
-                ORDER BY e.evaluated_at DESC
-                LIMIT ?
-            """, (limit,))
+            cursor.execute(_SQL_SELECT_RECENT_EVALUATIONS, (limit,))
             
             return [
                 {
-                    'id': row['id'],
-                    'assignment_id': row['assignment_id'],
-                    'assignment_title': row['assignment_title'],
-                    'student_name': row['student_name'],
-                    'evaluated_at': row['evaluated_at'],
-                    'total_score': row['total_score'],
-                    'max_score': row['max_score'],
-                    'percentage': row['percentage'],
-                    'evaluation_mode': row['evaluation_mode']
+                    'id': eval_id,
+                    'assignment_id': assignment_id,
+                    'assignment_title': assignment_title,
+                    'student_name': student_name,
+                    'evaluated_at': evaluated_at,
+                    'total_score': total_score,
+                    'max_score': max_score,
+                    'percentage': percentage,
+                    'evaluation_mode': evaluation_mode
                 }
-                for row in cursor.fetchall()
+                for (eval_id, assignment_id, assignment_title, student_name, evaluated_at,
+                     total_score, max_score, percentage, evaluation_mode) in cursor.fetchall()
             ]
     
     def delete_evaluation(self, evaluation_id: int) -> bool:
         """Delete an evaluation."""
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("DELETE FROM evaluations WHERE id = ?", (evaluation_id,))
+            cursor.execute(_SQL_DELETE_EVALUATION, (evaluation_id,))
             return cursor.rowcount > 0
     
     def update_evaluation_student_name(self, evaluation_id: int, new_name: str) -> bool:
@@ -427,10 +740,7 @@ class Database:
         """
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute(
-                "UPDATE evaluations SET student_name = ? WHERE id = ?",
-                (new_name, evaluation_id)
-            )
+            cursor.execute(_SQL_RENAME_EVALUATION_STUDENT, (new_name, evaluation_id))
             return cursor.rowcount > 0
     
     def delete_all_evaluations(self, assignment_id: Optional[int] = None) -> int:
@@ -447,46 +757,54 @@ class Database:
             cursor = conn.cursor()
             
             if assignment_id:
-                cursor.execute("SELECT COUNT(*) FROM evaluations WHERE assignment_id = ?", (assignment_id,))
-                count = cursor.fetchone()[0]
-                cursor.execute("DELETE FROM evaluations WHERE assignment_id = ?", (assignment_id,))
+                cursor.execute(_SQL_DELETE_EVALUATIONS_BY_ASSIGNMENT, (assignment_id,))
             else:
-                cursor.execute("SELECT COUNT(*) FROM evaluations")
-                count = cursor.fetchone()[0]
-                cursor.execute("DELETE FROM evaluations")
+                cursor.execute(_SQL_DELETE_ALL_EVALUATIONS)
             
-            return count
+            return cursor.rowcount
     
     # ===== EXPORT OPERATIONS =====
     
-    def export_evaluations_to_csv(self, assignment_id: Optional[int] = None) -> pd.DataFrame:
+    def export_evaluations_to_csv(self, assignment_id: Optional[int] = None,
+                                  include_results: bool = False,
+                                  chunksize: int = 10000) -> pd.DataFrame:
         """
         Export evaluations to DataFrame for CSV export.
         
         Args:
             assignment_id: Optional assignment ID to filter by
+            include_results: Also export the decoded results_json column (large, off by default)
+            chunksize: Rows fetched per chunk, bounds peak memory on large tables
             
         Returns:
             pd.DataFrame: Evaluations data
         """
+        columns = [
+            "e.id", "e.assignment_id", "e.student_name", "e.evaluated_at",
+            "e.total_score", "e.max_score", "e.percentage", "e.evaluation_mode"
+        ]
+        if include_results:
+            columns += ["e.results_json", "e.results_blob"]
+        
+        where = "WHERE e.assignment_id = ?" if assignment_id else ""
+        params = (assignment_id,) if assignment_id else ()
+        query = _SQL_EXPORT_EVALUATIONS.format(columns=', '.join(columns), where=where)
+        
         with self.get_connection() as conn:
-            if assignment_id:
-                query = """
-                    SELECT e.*, a.title as assignment_title
-                    FROM evaluations e
-                    JOIN assignments a ON e.assignment_id = a.id
-                    WHERE e.assignment_id = ?
-                    ORDER BY e.evaluated_at DESC
-                """
-                df = pd.read_sql_query(query, conn, params=(assignment_id,))
-            else:
-                query = """
-                    SELECT e.*, a.title as assignment_title
-                    FROM evaluations e
-                    JOIN assignments a ON e.assignment_id = a.id
-                    ORDER BY e.evaluated_at DESC
-                """
-                df = pd.read_sql_query(query, conn)
+            chunks = pd.read_sql_query(
+                query, conn,
+                params=params,
+                parse_dates=['evaluated_at'],
+                dtype={'total_score': 'float64', 'max_score': 'float64', 'percentage': 'float64'},
+                chunksize=chunksize
+            )
+            df = pd.concat(chunks, ignore_index=True)
+            
+            if include_results:
+                df['results_json'] = [
+                    orjson.dumps(self._decode_results(text, blob)).decode('utf-8')
+                    for text, blob in zip(df['results_json'], df.pop('results_blob'))
+                ]
             
             return df
     
@@ -502,7 +820,7 @@ class Database:
         """
         assignment_data = self.load_assignment(assignment_id)
         if assignment_data:
-            return json.dumps(assignment_data, indent=2)
+            return orjson.dumps(assignment_data, option=orjson.OPT_INDENT_2).decode('utf-8')
         return None
     
     def import_assignment_from_json(self, json_str: str) -> int:
@@ -515,10 +833,11 @@ class Database:
         Returns:
             int: New assignment ID
         """
-        assignment_data = json.loads(json_str)
-        return self.save_assignment(assignment_data)
+        assignment_data = orjson.loads(json_str)
+        with self._bulk_import():
+            return self.save_assignment(assignment_data)
     
-    def import_assignment_from_csv(self, csv_content: str, title: str = "Imported Assignment") -> dict:
+    def import_assignment_from_csv(self, csv_content: Union[str, BinaryIO], title: str = "Imported Assignment") -> dict:
         """
         Import assignment from CSV format with optional student answers.
         
@@ -531,77 +850,60 @@ class Database:
         Rows: student_name,answer1,answer2,... (optional)
         
         Args:
-            csv_content: CSV file content as string
+            csv_content: CSV file content as string, or a binary file object (e.g. an upload),
+                which is decoded line by line instead of as one string
             title: Assignment title
             
         Returns:
             dict: {'assignment_id': int, 'students': list of dicts with student answers}
         """
-        import csv
-        from io import StringIO
-        
-        reader = csv.reader(StringIO(csv_content))
-        rows = list(reader)
-        
+        # Tokenize with the C csv reader, then classify rows with column-wise pandas ops
+        if isinstance(csv_content, str):
+            lines = StringIO(csv_content)
+        else:
+            lines = codecs.iterdecode(csv_content, 'utf-8')
+        rows = list(csv.reader(lines))
         if len(rows) < 2:
             raise ValueError("CSV must have at least 2 rows (header + data)")
         
-        rubric = []
-        questions = []
-        students = []  # Store student answers separately
-        
-        section = "rubric"  # rubric, questions, or students
-        
-        for i, row in enumerate(rows):
-            if len(row) == 0 or all(cell.strip() == '' for cell in row):
-                continue
-            
-            first_cell = row[0].strip().upper()
-            
-            # Detect section transitions
-            if first_cell in ['QUESTIONS', 'QUESTION']:
-                section = "questions"
-                continue
-            elif first_cell in ['STUDENTS', 'STUDENT', 'ANSWERS']:
-                section = "students"
-                continue
-            
-            # Skip header rows
-            if i == 0 and ('CRITERIA' in first_cell or 'CRITERION' in first_cell):
-                continue
-            
-            # Process based on current section
-            if section == "rubric":
-                if len(row) >= 2 and row[0].strip() and row[1].strip():
-                    try:
-                        rubric.append({
-                            'CRITERIA': row[0].strip(),
-                            'TOTAL MARKS': int(row[1].strip())
-                        })
-                    except ValueError:
-                        continue
-            
-            elif section == "questions":
-                if len(row) >= 2 and row[1].strip():
-                    questions.append({
-                        'question_number': len(questions) + 1,
-                        'question_text': row[1].strip()
-                    })
-            
-            elif section == "students":
-                if len(row) >= 2 and row[0].strip():
-                    student_name = row[0].strip()
-                    # Remaining columns are answers to questions
-                    answers = {}
-                    for idx, answer in enumerate(row[1:], 1):
-                        if idx <= len(questions):  # Only store answers for existing questions
-                            answers[idx] = answer.strip() if answer else ""
-                    
-                    if answers:
-                        students.append({
-                            'student_name': student_name,
-                            'answers': answers  # Dict: {question_number: answer}
-                        })
+        # Ragged rows are padded with '' so every cell can be stripped in one pass
+        cells = pd.DataFrame(rows, dtype=object)
+        cells = cells.reindex(columns=range(max(cells.shape[1], 2))).fillna('')
+        cells = cells.apply(lambda col: col.str.strip())
+        row_len = pd.Series([len(row) for row in rows])
+        first_cell = cells[0].str.upper()
+        
+        # Section markers switch the section for every row that follows them
+        marker = first_cell.map(_CSV_SECTION_MARKERS)
+        section = marker.ffill().fillna("rubric")
+        is_header = (cells.index == 0) & first_cell.str.contains("CRITERIA|CRITERION")
+        is_data = (cells != '').any(axis=1) & marker.isna() & ~is_header & (row_len >= 2)
+        
+        # Rubric rows: non-integer marks are skipped
+        rubric_mask = (is_data & (section == "rubric") & (cells[0] != '')
+                       & cells[1].str.fullmatch(r"[+-]?\d+"))
+        rubric = [
+            {'CRITERIA': criteria, 'TOTAL MARKS': int(total)}
+            for criteria, total in zip(cells[0][rubric_mask], cells[1][rubric_mask])
+        ]
+        
+        question_mask = is_data & (section == "questions") & (cells[1] != '')
+        questions = [
+            {'question_number': number, 'question_text': text}
+            for number, text in enumerate(cells[1][question_mask], 1)
+        ]
+        
+        # Student rows: only answers for questions listed above the row are kept
+        answer_count = (row_len - 1).clip(upper=question_mask.cumsum())
+        student_mask = is_data & (section == "students") & (cells[0] != '') & (answer_count > 0)
+        values = cells.to_numpy()
+        students = [
+            {
+                'student_name': values[i, 0],
+                'answers': {idx: values[i, idx] for idx in range(1, count + 1)}  # {question_number: answer}
+            }
+            for i, count in zip(cells.index[student_mask], answer_count[student_mask])
+        ]
         
         # Validation
         if not rubric:
@@ -627,8 +929,9 @@ class Database:
             'total_marks': max_marks_per_question * len(questions)
         }
         
-        # Save assignment
-        assignment_id = self.save_assignment(assignment_data)
+        # Save assignment (one transaction, batched question/rubric inserts)
+        with self._bulk_import():
+            assignment_id = self.save_assignment(assignment_data)
         
         # Return both assignment ID and student answers
         return {
@@ -636,215 +939,53 @@ class Database:
             'students': students,
             'questions_count': len(questions)
         }
+    
+    # ===== GRADING CHECKPOINTS =====
+    
+    def save_grading_checkpoints(self, checkpoints: List[Tuple[int, str, int, str, str]]):
         """
-        Import assignment from CSV format with optional student answers.
+        Record a batch of graded questions in one transaction.
         
-        CSV Format Expected:
-        Row 1: CRITERIA,TOTAL MARKS
-        Rows 2+: Criterion name, marks
-        Row with "QUESTIONS,"
-        Rows: question_number,question_text
-        Row with "STUDENTS," (optional)
-        Rows: student_name,answer1,answer2,... (optional)
+        Args:
+            checkpoints: (assignment_id, student_name, question_number, input_hash, response_json) rows,
+                where input_hash covers everything that went into the prompt (mode, rubric, question, answer)
+        """
+        with self.get_connection() as conn:
+            conn.executemany(_SQL_SAVE_GRADING_CHECKPOINT, checkpoints)
+    
+    def get_grading_checkpoints(self, assignment_id: int) -> Dict[Tuple[str, int], Tuple[str, str]]:
+        """
+        Get results already graded by an earlier, unfinished run.
         
         Args:
-            csv_content: CSV file content as string
-            title: Assignment title
+            assignment_id: Assignment ID
             
         Returns:
-            int: New assignment ID
+            Dict: {(student_name, question_number): (input_hash, response_json)}
         """
-        import csv
-        from io import StringIO
-        
-        reader = csv.reader(StringIO(csv_content))
-        rows = list(reader)
-        
-        if len(rows) < 2:
-            raise ValueError("CSV must have at least 2 rows (header + data)")
-        
-        rubric = []
-        questions = []
-        students = []  # New: store student answers
-        
-        section = "rubric"  # rubric, questions, or students
-        
-        for i, row in enumerate(rows):
-            if len(row) == 0 or all(cell.strip() == '' for cell in row):
-                continue
-            
-            first_cell = row[0].strip().upper()
-            
-            # Detect section transitions
-            if first_cell in ['QUESTIONS', 'QUESTION']:
-                section = "questions"
-                continue
-            elif first_cell in ['STUDENTS', 'STUDENT', 'ANSWERS']:
-                section = "students"
-                continue
-            
-            # Skip header rows
-            if i == 0 and ('CRITERIA' in first_cell or 'CRITERION' in first_cell):
-                continue
-            
-            # Process based on current section
-            if section == "rubric":
-                if len(row) >= 2 and row[0].strip() and row[1].strip():
-                    try:
-                        rubric.append({
-                            'CRITERIA': row[0].strip(),
-                            'TOTAL MARKS': int(row[1].strip())
-                        })
-                    except ValueError:
-                        continue
-            
-            elif section == "questions":
-                if len(row) >= 2 and row[1].strip():
-                    questions.append({
-                        'question_number': len(questions) + 1,
-                        'question_text': row[1].strip()
-                    })
-            
-            elif section == "students":
-                if len(row) >= 2 and row[0].strip():
-                    # First column is student name
-                    student_name = row[0].strip()
-                    # Remaining columns are answers to questions
-                    answers = [cell.strip() for cell in row[1:] if cell.strip()]
-                    
-                    if answers:  # Only add if there are answers
-                        students.append({
-                            'student_name': student_name,
-                            'answers': answers
-                        })
-        
-        # Validation
-        if not rubric:
-            # Use default rubric
-            rubric = [
-                {'CRITERIA': 'Correctness', 'TOTAL MARKS': 5},
-                {'CRITERIA': 'Explanation', 'TOTAL MARKS': 3},
-                {'CRITERIA': 'Clarity', 'TOTAL MARKS': 2}
-            ]
-        
-        if not questions:
-            raise ValueError("No questions found in CSV")
-        
-        # Calculate marks
-        max_marks_per_question = sum(r['TOTAL MARKS'] for r in rubric)
-        
-        # Create assignment data
-        assignment_data = {
-            'title': title,
-            'questions': questions,
-            'rubric': rubric,
-            'max_marks_per_question': max_marks_per_question,
-            'total_marks': max_marks_per_question * len(questions),
-            'students': students  # Include student answers
-        }
-        
-        return self.save_assignment(assignment_data)
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(_SQL_SELECT_GRADING_CHECKPOINTS, (assignment_id,))
+            return {
+                (student_name, question_number): (input_hash, response_json)
+                for student_name, question_number, input_hash, response_json in cursor.fetchall()
+            }
+    
+    def clear_grading_checkpoints(self, assignment_id: int, student_name: str) -> int:
         """
-        Import assignment from CSV format.
-        
-        CSV Format Expected:
-        Row 1: Rubric criteria (CRITERIA,TOTAL MARKS)
-        Rows 2+: Question Number, Question Text
-        
-        Alternative Format:
-        question_number,question_text,criterion_1,criterion_2,...
+        Drop a student's checkpoints once their evaluation has been saved.
         
         Args:
-            csv_content: CSV file content as string
-            title: Assignment title
+            assignment_id: Assignment ID
+            student_name: Student name
             
         Returns:
-            int: New assignment ID
+            int: Number of checkpoints removed
         """
-        import csv
-        from io import StringIO
-        
-        reader = csv.reader(StringIO(csv_content))
-        rows = list(reader)
-        
-        if len(rows) < 2:
-            raise ValueError("CSV must have at least 2 rows (header + data)")
-        
-        # Detect format based on first row
-        header = rows[0]
-        
-        # Format 1: Simple format with questions only
-        # question_number,question_text
-        if len(header) == 2 and 'question' in header[0].lower():
-            questions = []
-            for row in rows[1:]:
-                if len(row) >= 2 and row[1].strip():
-                    questions.append({
-                        'question_number': len(questions) + 1,
-                        'question_text': row[1].strip()
-                    })
-            
-            # Default rubric for simple format
-            rubric = [
-                {'CRITERIA': 'Correctness', 'TOTAL MARKS': 5},
-                {'CRITERIA': 'Explanation', 'TOTAL MARKS': 3},
-                {'CRITERIA': 'Clarity', 'TOTAL MARKS': 2}
-            ]
-            
-        # Format 2: Full format with rubric
-        # CRITERIA,TOTAL MARKS (first row is rubric header)
-        elif 'CRITERIA' in header[0] or 'criteria' in header[0].lower():
-            # First section: Rubric
-            rubric = []
-            questions = []
-            in_questions = False
-            
-            for i, row in enumerate(rows[1:], 1):
-                if len(row) < 2:
-                    continue
-                    
-                # Check if this is start of questions section
-                if row[0].lower().strip() in ['questions', 'question', 'q']:
-                    in_questions = True
-                    continue
-                
-                if not in_questions:
-                    # Still in rubric section
-                    if row[0].strip() and row[1].strip():
-                        rubric.append({
-                            'CRITERIA': row[0].strip(),
-                            'TOTAL MARKS': int(row[1].strip())
-                        })
-                else:
-                    # In questions section
-                    if row[1].strip():  # Has question text
-                        questions.append({
-                            'question_number': len(questions) + 1,
-                            'question_text': row[1].strip()
-                        })
-        else:
-            raise ValueError("Unrecognized CSV format. Please use standard format.")
-        
-        if not questions:
-            raise ValueError("No questions found in CSV")
-        
-        if not rubric:
-            raise ValueError("No rubric found in CSV")
-        
-        # Calculate marks
-        max_marks_per_question = sum(r['TOTAL MARKS'] for r in rubric)
-        
-        # Create assignment data
-        assignment_data = {
-            'title': title,
-            'questions': questions,
-            'rubric': rubric,
-            'max_marks_per_question': max_marks_per_question,
-            'total_marks': max_marks_per_question * len(questions)
-        }
-        
-        return self.save_assignment(assignment_data)
-    
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(_SQL_CLEAR_GRADING_CHECKPOINTS, (assignment_id, student_name))
+            return cursor.rowcount
     
     # ===== STATISTICS =====
     
@@ -860,25 +1001,17 @@ class Database:
         """
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("""
-                SELECT 
-                    COUNT(*) as total_evaluations,
-                    AVG(percentage) as avg_percentage,
-                    MIN(percentage) as min_percentage,
-                    MAX(percentage) as max_percentage,
-                    AVG(total_score) as avg_score
-                FROM evaluations
-                WHERE assignment_id = ?
-            """, (assignment_id,))
+            cursor.execute(_SQL_ASSIGNMENT_STATISTICS, (assignment_id,))
             
             row = cursor.fetchone()
-            if row and row['total_evaluations'] > 0:
+            if row is not None:
+                total_evaluations, sum_percentage, min_percentage, max_percentage, sum_score = row
                 return {
-                    'total_evaluations': row['total_evaluations'],
-                    'avg_percentage': round(row['avg_percentage'], 2),
-                    'min_percentage': round(row['min_percentage'], 2),
-                    'max_percentage': round(row['max_percentage'], 2),
-                    'avg_score': round(row['avg_score'], 2)
+                    'total_evaluations': total_evaluations,
+                    'avg_percentage': round(sum_percentage / total_evaluations, 2),
+                    'min_percentage': round(min_percentage, 2),
+                    'max_percentage': round(max_percentage, 2),
+                    'avg_score': round(sum_score / total_evaluations, 2)
                 }
             return {
                 'total_evaluations': 0,
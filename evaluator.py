@@ -4,61 +4,112 @@ Handles all LLM interaction logic for rubric-based evaluation.
 """
 
 import os
+import re
+import time
+import asyncio
+import hashlib
+import httpx
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+import ijson
+import orjson
+import tiktoken
+import zstandard
+from aiolimiter import AsyncLimiter
+from diskcache import Cache
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import (
+    OpenAI,
+    APIConnectionError,
+    APITimeoutError,
+    InternalServerError,
+    RateLimitError
+)
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
+from prompts import build_prompt, build_batch_prompt
 
 # Load environment variables
 load_dotenv()
 
 
-class RubricEvaluator:
-    """
-    Handles communication with Groq LLM for rubric-based evaluation.
+class _APIStatusError(Exception):
+    """Error status returned to a direct (non-SDK) request."""
+
+
+class _RetryableStatusError(_APIStatusError):
+    """HTTP 429 or 5xx returned to a direct (non-SDK) request."""
+
+
+# Transient failures worth retrying; bad requests and auth errors fail immediately
+_RETRYABLE_ERRORS = (
+    RateLimitError, APITimeoutError, APIConnectionError, InternalServerError,  # SDK calls
+    _RetryableStatusError, httpx.TransportError  # Direct httpx calls in the batch path
+)
+
+_retry_api_call = retry(
+    wait=wait_exponential(multiplier=1, max=30),
+    stop=stop_after_attempt(6),
+    retry=retry_if_exception_type(_RETRYABLE_ERRORS),
+    reraise=True
+)
+
+
+@lru_cache(maxsize=None)
+def _shared_client(api_key: Optional[str], base_url: str) -> OpenAI:
+    """Process-wide sync client per credentials, so every RubricEvaluator reuses one connection pool."""
+    # Retries are handled by _retry_api_call, so the SDK's own retry loop is disabled
+    return OpenAI(api_key=api_key, base_url=base_url, max_retries=0)
+
+
+def _parse_duration(value: str) -> float:
+    """Parse Groq reset durations such as '7.66s', '2m59.56s' or '120ms' into seconds."""
+    units = {"h": 3600, "m": 60, "s": 1, "ms": 0.001}
+    parts = re.findall(r"([\d.]+)(ms|h|m|s)", value)
+    if not parts:
+        return float(value)  # Retry-After is plain seconds
+    return sum(float(amount) * units[unit] for amount, unit in parts)
+
+
+@lru_cache(maxsize=1)
+def _token_encoding():
+    """Tokenizer used to size batches (cl100k_base approximates Llama token counts)."""
+    return tiktoken.get_encoding("cl100k_base")
+
+
+def _count_tokens(text: str) -> int:
+    """Approximate number of prompt tokens in text."""
+    return len(_token_encoding().encode(text))
+
+
+def stream_scores(chunks: Iterable[str]) -> Iterator[Dict]:
     """
+    Incrementally parse a streamed evaluation response, yielding each "scores" entry once it is complete.
     
-    def __init__(self):
-        """Initialize Groq client."""
-        self.client = OpenAI(
-            api_key=os.getenv("GROQ_API_KEY"),
-            base_url="https://api.groq.com/openai/v1"
-        )
-        self.model = "llama-3.3-70b-versatile"
-        self.mode = "moderate"  # Default mode
-        self.temperature = 0.2  # Default temperature
-    
-    def set_mode(self, mode: str):
-        """
-        Set evaluation mode (strict, moderate, or lenient).
-        
-        Args:
-            mode: Evaluation mode ('strict', 'moderate', or 'lenient')
-        """
-        mode = mode.lower()
-        
-        # Map modes to temperature values
-        mode_settings = {
-            "strict": 0.05,     # Very low temperature = very conservative/strict
-            "moderate": 0.3,    # Balanced approach
-            "lenient": 0.6      # Higher temperature = more generous/creative
-        }
-        
-        if mode in mode_settings:
-            self.mode = mode
-            self.temperature = mode_settings[mode]
-        else:
-            # Default to moderate if invalid mode
-            self.mode = "moderate"
-            self.temperature = 0.3
+    The input is always consumed to the end, so a caller collecting the chunks gets the full text
+    even if the response turns out not to be valid JSON (in which case nothing more is yielded).
     
-    def get_mode_instructions(self) -> str:
-        """
-        Get mode-specific instructions for the LLM.
+    Args:
+        chunks: Text pieces of the response, e.g. from RubricEvaluator.evaluate_stream()
         
-        Returns:
-            str: Instructions based on current evaluation mode
-        """
-        instructions = {
-            "strict": """
+    Yields:
+        Dict: One {"criterion", "awarded", "max", "reason"} entry at a time
+    """
+    scores = ijson.sendable_list()
+    parser = ijson.items_coro(scores, "scores.item", use_float=True)
+    for chunk in chunks:
+        if parser is None:
+            continue
+        try:
+            parser.send(chunk.encode("utf-8"))
+        except ijson.JSONError:
+            parser = None
+        yield from scores
+        del scores[:]
+
+
+# Mode-specific grading instructions inserted into every wrapped prompt
+_MODE_INSTRUCTIONS = {
+    "strict": """
 EVALUATION MODE: STRICT - YOU MUST BE HIGHLY CRITICAL
 
 STRICT GRADING RULES (FOLLOW EXACTLY):
@@ -80,7 +131,7 @@ REASONING REQUIREMENTS:
 
 MINDSET: "What's wrong with this answer? What's missing?"
 """,
-            "moderate": """
+    "moderate": """
 EVALUATION MODE: MODERATE - BALANCED AND FAIR
 
 MODERATE GRADING RULES (FOLLOW EXACTLY):
@@ -102,7 +153,7 @@ REASONING REQUIREMENTS:
 
 MINDSET: "Does this answer demonstrate reasonable understanding?"
 """,
-            "lenient": """
+    "lenient": """
 EVALUATION MODE: LENIENT - GENEROUS AND ENCOURAGING
 
 LENIENT GRADING RULES (FOLLOW EXACTLY):
@@ -125,9 +176,115 @@ REASONING REQUIREMENTS:
 
 MINDSET: "What did the student understand? How can I reward their effort?"
 """
-        }
+}
+
+# Map modes to temperature values
+_MODE_TEMPERATURES = {
+    "strict": 0.05,     # Very low temperature = very conservative/strict
+    "moderate": 0.3,    # Balanced approach
+    "lenient": 0.6      # Higher temperature = more generous/creative
+}
+
+_MODE_EMPHASIS = {
+    "strict": "REMEMBER: You are in STRICT mode. Be HARSH and CRITICAL. Deduct points aggressively.",
+    "moderate": "REMEMBER: You are in MODERATE mode. Be FAIR and BALANCED in your scoring.",
+    "lenient": "REMEMBER: You are in LENIENT mode. Be GENEROUS and ENCOURAGING. Award points liberally."
+}
+
+
+def _build_prompt_prefix(mode: str) -> str:
+    """Everything _wrap_prompt puts before the evaluation prompt, for the given mode."""
+    mode_instructions = _MODE_INSTRUCTIONS.get(mode, _MODE_INSTRUCTIONS["moderate"])
+    
+    return f"""
+You are an academic evaluator.
+Evaluate the student's answer based on the rubric.
+
+{mode_instructions}
+
+{_MODE_EMPHASIS.get(mode, "")}
+
+IMPORTANT JSON FORMAT:
+- Return ONLY valid JSON.
+- Do NOT return explanation text outside JSON.
+- Do NOT use markdown.
+- Do NOT use backticks.
+- Apply the {mode.upper()} evaluation mode consistently across ALL criteria.
+
+Now evaluate:
+
+"""
+
+
+class RubricEvaluator:
+    """
+    Handles communication with Groq LLM for rubric-based evaluation.
+    """
+    
+    def __init__(self, max_workers: int = 16, requests_per_minute: Optional[int] = None,
+                 cache_dir: str = ".rubric_cache", cache_ttl: Optional[float] = 7 * 24 * 3600,
+                 max_batch_tokens: int = 6000, max_batch_size: int = 5):
+        """
+        Initialize Groq client.
+        
+        Args:
+            max_workers: Maximum number of concurrent requests in evaluate_many()
+            requests_per_minute: Request rate cap for evaluate_many() (defaults to GROQ_REQUESTS_PER_MINUTE or 30)
+            cache_dir: Directory of the on-disk prompt -> response cache
+            cache_ttl: Seconds a cached response stays valid (None keeps it forever)
+            max_batch_tokens: Token budget for the question/answer text packed into one batch prompt
+            max_batch_size: Maximum number of questions packed into one batch prompt
+        """
+        self._api_key = os.getenv("GROQ_API_KEY")
+        self._base_url = "https://api.groq.com/openai/v1"
+        # Shared across instances: keep-alive connections survive Streamlit reruns
+        self.client = _shared_client(self._api_key, self._base_url)
+        self.model = "llama-3.3-70b-versatile"
+        self.mode = "moderate"  # Default mode
+        self.temperature = 0.2  # Default temperature
+        self._prompt_prefix = _build_prompt_prefix(self.mode)
+        self.max_workers = max_workers
+        self.requests_per_minute = requests_per_minute or int(os.getenv("GROQ_REQUESTS_PER_MINUTE", "30"))
+        self._rate_limit_reset_at = 0.0  # time.monotonic() before which no request should be sent
+        # Successful responses keyed by model, temperature and full prompt; call cache.clear() to reset
+        self.cache = Cache(cache_dir)
+        self.cache_ttl = cache_ttl
+        # Cached responses are stored zstd-compressed; zstd contexts are per instance (not thread-safe)
+        self._compressor = zstandard.ZstdCompressor(level=3)
+        self._decompressor = zstandard.ZstdDecompressor()
+        self._key_settings = None  # (model, temperature, mode) that _key_prefix was computed for
+        self._key_prefix = b""
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+    
+    def set_mode(self, mode: str):
+        """
+        Set evaluation mode (strict, moderate, or lenient).
+        
+        Args:
+            mode: Evaluation mode ('strict', 'moderate', or 'lenient')
+        """
+        mode = mode.lower()
         
-        return instructions.get(self.mode, instructions["moderate"])
+        if mode in _MODE_TEMPERATURES:
+            self.mode = mode
+            self.temperature = _MODE_TEMPERATURES[mode]
+        else:
+            # Default to moderate if invalid mode
+            self.mode = "moderate"
+            self.temperature = 0.3
+        
+        # Wrapped prompts only differ by mode, so build the shared prefix once here
+        self._prompt_prefix = _build_prompt_prefix(self.mode)
+    
+    def get_mode_instructions(self) -> str:
+        """
+        Get mode-specific instructions for the LLM.
+        
+        Returns:
+            str: Instructions based on current evaluation mode
+        """
+        return _MODE_INSTRUCTIONS.get(self.mode, _MODE_INSTRUCTIONS["moderate"])
     
     def evaluate(self, prompt: str) -> str:
         """
@@ -140,18 +297,362 @@ MINDSET: "What did the student understand? How can I reward their effort?"
             str: JSON response from the model
         """
         structured_prompt = self._wrap_prompt(prompt)
+        key = self._cache_key(structured_prompt)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
         
         try:
-            response = self.client.chat.completions.create(
+            result = self._call(structured_prompt)
+        except Exception as e:
+            return self._error_response(e)
+        self._cache_set(key, result)
+        return result
+    
+    @_retry_api_call
+    def _call(self, structured_prompt: str) -> str:
+        """Send one request, honouring any rate-limit pause reported by earlier responses."""
+        time.sleep(max(0.0, self._rate_limit_reset_at - time.monotonic()))
+        try:
+            raw = self.client.chat.completions.with_raw_response.create(
                 model=self.model,
                 messages=[
                     {"role": "user", "content": structured_prompt}
                 ],
                 temperature=self.temperature
             )
-            return response.choices[0].message.content
+        except RateLimitError as e:
+            self._record_rate_limits(e.response.headers)
+            raise
+        self._record_rate_limits(raw.headers)
+        return raw.parse().choices[0].message.content
+    
+    def evaluate_stream(self, prompt: str) -> Iterator[str]:
+        """
+        Like evaluate(), but yields the response text as the model generates it.
+        
+        A cached response is yielded as a single piece. A failure before the first token
+        is yielded as the same error JSON evaluate() returns; a failure mid-response is raised.
+        Use "".join(evaluator.evaluate_stream(prompt)) where the whole text is needed.
+        
+        Args:
+            prompt: The formatted evaluation prompt
+            
+        Yields:
+            str: Successive pieces of the JSON response
+        """
+        structured_prompt = self._wrap_prompt(prompt)
+        key = self._cache_key(structured_prompt)
+        cached = self._cache_get(key)
+        if cached is not None:
+            yield cached
+            return
+        
+        try:
+            stream = self._open_stream(structured_prompt)
         except Exception as e:
-            return f'{{"error": "API Error: {str(e)}"}}'
+            yield self._error_response(e)
+            return
+        
+        parts = []
+        with stream:
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                content = chunk.choices[0].delta.content
+                if content:
+                    parts.append(content)
+                    yield content
+        self._cache_set(key, "".join(parts))
+    
+    @_retry_api_call
+    def _open_stream(self, structured_prompt: str):
+        """Start a streamed request; only opening the stream is retried, not a partly received response."""
+        time.sleep(max(0.0, self._rate_limit_reset_at - time.monotonic()))
+        try:
+            raw = self.client.chat.completions.with_raw_response.create(
+                model=self.model,
+                messages=[
+                    {"role": "user", "content": structured_prompt}
+                ],
+                temperature=self.temperature,
+                stream=True
+            )
+        except RateLimitError as e:
+            self._record_rate_limits(e.response.headers)
+            raise
+        self._record_rate_limits(raw.headers)
+        return raw.parse()
+    
+    async def evaluate_many(self, prompts: List[str],
+                            progress_callback: Optional[Callable[[int, int], None]] = None,
+                            result_callback: Optional[Callable[[int, str], None]] = None) -> List[str]:
+        """
+        Evaluate many prompts concurrently, at most max_workers requests in flight.
+        
+        Args:
+            prompts: The formatted evaluation prompts
+            progress_callback: Optional callback called with (completed, total) as each prompt finishes
+            result_callback: Optional callback called with (prompt index, response) as each prompt finishes
+            
+        Returns:
+            List[str]: JSON responses in the same order as prompts
+        """
+        semaphore = asyncio.Semaphore(self.max_workers)
+        limiter = AsyncLimiter(self.requests_per_minute, 60)
+        completed = 0
+        
+        # Identical prompts (e.g. several blank answers) are sent once and share the response
+        indices_by_prompt = {}
+        for index, prompt in enumerate(prompts):
+            indices_by_prompt.setdefault(prompt, []).append(index)
+        
+        async def run(http: httpx.AsyncClient, prompt: str, indices: List[int]) -> str:
+            nonlocal completed
+            async with semaphore:
+                result = await self._evaluate_async(http, limiter, prompt)
+            completed += len(indices)
+            if result_callback:
+                for index in indices:
+                    result_callback(index, result)
+            if progress_callback:
+                progress_callback(completed, len(prompts))
+            return result
+        
+        # The async client's connection pool is tied to the running event loop,
+        # so it lives for one batch rather than for the evaluator's lifetime.
+        async with self._async_http_client() as http:
+            unique_results = await asyncio.gather(
+                *(run(http, prompt, indices) for prompt, indices in indices_by_prompt.items()),
+                return_exceptions=True
+            )
+        
+        results = [None] * len(prompts)
+        for indices, result in zip(indices_by_prompt.values(), unique_results):
+            if not isinstance(result, str):
+                result = self._error_response(result)
+            for index in indices:
+                results[index] = result
+        return results
+    
+    def evaluate_batch(self, questions: List[str], rubric: str, answers: List[str]) -> List[str]:
+        """
+        Evaluate several answers by the same student with as few requests as possible.
+        
+        Args:
+            questions: Question texts
+            rubric: The evaluation rubric (formatted)
+            answers: The student's answers, aligned with questions
+            
+        Returns:
+            List[str]: One JSON response per question, same format as evaluate()
+        """
+        return asyncio.run(self.evaluate_many_batched([list(zip(questions, answers))], rubric))[0]
+    
+    async def evaluate_many_batched(self, groups: List[List[Tuple[str, str]]], rubric: str,
+                                    progress_callback: Optional[Callable[[int, int], None]] = None,
+                                    result_callback: Optional[Callable[[int, int, str], None]] = None
+                                    ) -> List[List[str]]:
+        """
+        Evaluate (question, answer) groups concurrently, packing each group into batch prompts.
+        
+        Each group (typically one student's answers) is split into batches under
+        max_batch_tokens / max_batch_size. Batches whose response can't be split
+        into one result per question are re-evaluated one question at a time.
+        
+        Args:
+            groups: Per group, the (question_text, answer) pairs to evaluate
+            rubric: The evaluation rubric (formatted), shared by every question
+            progress_callback: Optional callback called with (completed, total) requests
+            result_callback: Optional callback called with (group index, pair index, response)
+                as soon as each pair's result is known, e.g. to checkpoint it
+            
+        Returns:
+            List[List[str]]: JSON responses aligned with groups and their pairs
+        """
+        batches = []  # (group index, pair indices)
+        for group_idx, pairs in enumerate(groups):
+            for batch in self.pack_batches([f"{question}\n{answer}" for question, answer in pairs]):
+                batches.append((group_idx, batch))
+        
+        prompts = [
+            build_batch_prompt([groups[g][i][0] for i in batch], rubric, [groups[g][i][1] for i in batch])
+            for g, batch in batches
+        ]
+        results = [[None] * len(pairs) for pairs in groups]
+        unsplit = []
+        
+        def record(group_idx: int, i: int, response: str):
+            results[group_idx][i] = response
+            if result_callback:
+                result_callback(group_idx, i, response)
+        
+        def record_batch(batch_idx: int, response: str):
+            group_idx, batch = batches[batch_idx]
+            try:
+                split = self.split_batch_response(response, len(batch))
+            except Exception:
+                # Raised here it would be swallowed by gather(); retry the questions one by one instead
+                split = None
+            if split is None:
+                unsplit.extend((group_idx, i) for i in batch)
+                return
+            for i, result in zip(batch, split):
+                record(group_idx, i, result)
+        
+        await self.evaluate_many(prompts, progress_callback, result_callback=record_batch)
+        
+        if unsplit:
+            retry_prompts = [
+                build_prompt(groups[g][i][0], rubric, groups[g][i][1])
+                for g, i in unsplit
+            ]
+            await self.evaluate_many(retry_prompts, progress_callback,
+                                     result_callback=lambda k, response: record(*unsplit[k], response))
+        
+        return results
+    
+    def pack_batches(self, texts: List[str]) -> List[List[int]]:
+        """
+        Group consecutive item indices into batches under the token and size limits.
+        
+        Args:
+            texts: Text of each item (question plus answer)
+            
+        Returns:
+            List[List[int]]: Item indices per batch; an oversized item gets a batch of its own
+        """
+        batches = []
+        current = []
+        current_tokens = 0
+        for idx, text in enumerate(texts):
+            tokens = _count_tokens(text)
+            if current and (current_tokens + tokens > self.max_batch_tokens
+                            or len(current) >= self.max_batch_size):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(idx)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+    
+    @staticmethod
+    def split_batch_response(response: str, count: int) -> Optional[List[str]]:
+        """
+        Split a batch response into one JSON string per question.
+        
+        Args:
+            response: Raw model response to a build_batch_prompt() prompt
+            count: Number of questions in the batch
+            
+        Returns:
+            List[str] or None: Per-question JSON, or None if the response doesn't hold exactly count results
+        """
+        try:
+            results = orjson.loads(response)["results"]
+        except (ValueError, TypeError, KeyError):
+            return None
+        if not isinstance(results, list) or len(results) != count:
+            return None
+        if not all(isinstance(result, dict) for result in results):
+            return None
+        
+        # Prefer the question numbers the model echoed back; fall back to list order
+        numbers = [result.pop("question", None) for result in results]
+        if all(type(n) is int for n in numbers) and sorted(numbers) == list(range(1, count + 1)):
+            results = [result for _, result in sorted(zip(numbers, results), key=lambda pair: pair[0])]
+        return [orjson.dumps(result).decode("utf-8") for result in results]
+    
+    async def _evaluate_async(self, http: httpx.AsyncClient, limiter: AsyncLimiter, prompt: str) -> str:
+        """Async counterpart of evaluate() using the given client and rate limiter."""
+        structured_prompt = self._wrap_prompt(prompt)
+        key = self._cache_key(structured_prompt)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+        
+        try:
+            result = await self._call_async(http, limiter, structured_prompt)
+        except Exception as e:
+            return self._error_response(e)
+        self._cache_set(key, result)
+        return result
+    
+    def _async_http_client(self) -> httpx.AsyncClient:
+        """Plain HTTP client for the batch path, sized for max_workers concurrent requests."""
+        return httpx.AsyncClient(
+            base_url=self._base_url,
+            headers={"Authorization": f"Bearer {self._api_key}", "Content-Type": "application/json"},
+            limits=httpx.Limits(max_connections=self.max_workers, max_keepalive_connections=self.max_workers),
+            timeout=httpx.Timeout(120.0, connect=10.0)
+        )
+    
+    @_retry_api_call
+    async def _call_async(self, http: httpx.AsyncClient, limiter: AsyncLimiter, structured_prompt: str) -> str:
+        """
+        Async counterpart of _call(); every attempt, including retries, takes a limiter slot.
+        
+        Posts straight to the chat completions endpoint and parses with orjson, skipping the
+        SDK's response model construction, which dominates CPU at high concurrency.
+        """
+        await asyncio.sleep(max(0.0, self._rate_limit_reset_at - time.monotonic()))
+        async with limiter:
+            response = await http.post("/chat/completions", content=orjson.dumps({
+                "model": self.model,
+                "messages": [
+                    {"role": "user", "content": structured_prompt}
+                ],
+                "temperature": self.temperature
+            }))
+        self._record_rate_limits(response.headers)
+        if response.status_code == 429 or response.status_code >= 500:
+            raise _RetryableStatusError(f"Error code: {response.status_code} - {response.text}")
+        if response.status_code >= 400:
+            raise _APIStatusError(f"Error code: {response.status_code} - {response.text}")
+        return orjson.loads(response.content)["choices"][0]["message"]["content"]
+    
+    def _record_rate_limits(self, headers: Mapping[str, str]):
+        """
+        Pause all further requests when Groq reports an exhausted request or token budget.
+        
+        Args:
+            headers: Response headers carrying x-ratelimit-* / retry-after values
+        """
+        wait = 0.0
+        if headers.get("retry-after"):
+            wait = _parse_duration(headers["retry-after"])
+        for budget in ("requests", "tokens"):
+            if headers.get(f"x-ratelimit-remaining-{budget}") == "0":
+                wait = max(wait, _parse_duration(headers.get(f"x-ratelimit-reset-{budget}", "0")))
+        if wait:
+            self._rate_limit_reset_at = max(self._rate_limit_reset_at, time.monotonic() + wait)
+    
+    def _cache_get(self, key: str) -> Optional[str]:
+        """Cached response for key, or None."""
+        cached = self.cache.get(key)
+        if isinstance(cached, bytes):
+            return self._decompressor.decompress(cached).decode("utf-8")
+        return cached  # None, or a response cached uncompressed before compression was added
+    
+    def _cache_set(self, key: str, response: str):
+        """Cache a successful response for cache_ttl seconds."""
+        self.cache.set(key, self._compressor.compress(response.encode("utf-8")), expire=self.cache_ttl)
+    
+    def _cache_key(self, structured_prompt: str) -> str:
+        """Cache key for a fully wrapped prompt at the current model, temperature and mode."""
+        # temperature is also assigned directly by callers, so the prefix is refreshed lazily
+        settings = (self.model, self.temperature, self.mode)
+        if settings != self._key_settings:
+            self._key_settings = settings
+            self._key_prefix = hashlib.sha256("|".join(map(str, settings)).encode()).digest()
+        return (self._key_prefix + hashlib.sha256(structured_prompt.encode()).digest()).hex()
+    
+    @staticmethod
+    def _error_response(error: BaseException) -> str:
+        """Format an API failure the same way a model response would be returned."""
+        # Serialized rather than formatted: HTTP error bodies are JSON and carry their own quotes
+        return orjson.dumps({"error": f"API Error: {error}"}).decode("utf-8")
     
     def _wrap_prompt(self, prompt: str) -> str:
         """
@@ -163,30 +664,4 @@ MINDSET: "What did the student understand? How can I reward their effort?"
         Returns:
             str: Wrapped prompt with JSON formatting instructions and mode
         """
-        mode_instructions = self.get_mode_instructions()
-        
-        mode_emphasis = {
-            "strict": "REMEMBER: You are in STRICT mode. Be HARSH and CRITICAL. Deduct points aggressively.",
-            "moderate": "REMEMBER: You are in MODERATE mode. Be FAIR and BALANCED in your scoring.",
-            "lenient": "REMEMBER: You are in LENIENT mode. Be GENEROUS and ENCOURAGING. Award points liberally."
-        }
-        
-        return f"""
-You are an academic evaluator.
-Evaluate the student's answer based on the rubric.
-
-{mode_instructions}
-
-{mode_emphasis.get(self.mode, "")}
-
-IMPORTANT JSON FORMAT:
-- Return ONLY valid JSON.
-- Do NOT return explanation text outside JSON.
-- Do NOT use markdown.
-- Do NOT use backticks.
-- Apply the {self.mode.upper()} evaluation mode consistently across ALL criteria.
-
-Now evaluate:
-
-{prompt}
-"""
+        return self._prompt_prefix + prompt + "\n"
@@ -5,11 +5,9 @@ Starts: Student Portal (HTML) + API Bridge + Teacher Portal (Streamlit)
 """
 
 import http.server
-import socketserver
 import webbrowser
-import threading
-import subprocess
-import time
+import asyncio
+import functools
 import os
 import sys
 
@@ -17,6 +15,9 @@ PORT_STUDENT = 8000  # Student portal HTML
 PORT_API = 8502      # API bridge for students
 PORT_TEACHER = 8501  # Teacher Streamlit app
 
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STARTUP_TIMEOUT = 60  # Seconds a service may take to start accepting connections
+
 class QuietHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
     def log_message(self, format, *args):
         pass
@@ -24,48 +25,65 @@ class QuietHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
         self.send_header('Cache-Control', 'no-store')
         super().end_headers()
 
+class ServiceError(RuntimeError):
+    """A service failed to start or stopped unexpectedly."""
+
+async def wait_port(host, port, proc=None, timeout=STARTUP_TIMEOUT):
+    """Wait until host:port accepts connections, failing early if proc exits first."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while True:
+        if proc is not None and proc.returncode is not None:
+            raise ServiceError(f"exited with code {proc.returncode} before listening on port {port}")
+        try:
+            _, writer = await asyncio.open_connection(host, port)
+        except OSError:
+            if loop.time() > deadline:
+                raise ServiceError(f"not listening on port {port} after {timeout}s")
+            await asyncio.sleep(0.05)
+        else:
+            writer.close()
+            await writer.wait_closed()
+            return
+
 def start_student_portal():
-    """Start student HTML portal"""
-    try:
-        os.chdir(os.path.dirname(os.path.abspath(__file__)))
-        with socketserver.TCPServer(("", PORT_STUDENT), QuietHTTPRequestHandler) as httpd:
-            httpd.serve_forever()
-    except:
-        pass
+    """Bind the student HTML portal (errors such as a busy port surface here)"""
+    handler = functools.partial(QuietHTTPRequestHandler, directory=BASE_DIR)
+    return http.server.ThreadingHTTPServer(("", PORT_STUDENT), handler)
 
-def start_api():
-    """Start API bridge"""
-    time.sleep(1)
+async def start_api(procs):
+    """Start API bridge and wait until it accepts connections"""
+    env = dict(os.environ, PORT=str(PORT_API))  # api_simple.py reads its port from $PORT
+    proc = await asyncio.create_subprocess_exec(sys.executable, "api_simple.py", cwd=BASE_DIR, env=env)
+    procs["API server"] = proc
     try:
-        subprocess.run(["python3", "api_simple.py"])
-    except:
-        print("⚠️  API server failed")
+        await wait_port("127.0.0.1", PORT_API, proc)
+    except ServiceError as e:
+        raise ServiceError(f"⚠️  API server failed: {e}") from None
+    return proc
 
-def start_teacher():
-    """Start teacher Streamlit app"""
-    time.sleep(2)
+async def start_teacher(procs):
+    """Start teacher Streamlit app and wait until it accepts connections"""
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            "streamlit", "run", "app.py", "--server.port", str(PORT_TEACHER), "--server.headless", "true",
+            "--server.enableWebsocketCompression", "true",  # Deflate the inline CSS and page deltas
+            cwd=BASE_DIR
+        )
+    except FileNotFoundError:
+        raise ServiceError("❌ Streamlit not found") from None
+    procs["Teacher portal"] = proc
     try:
-        subprocess.run(["streamlit", "run", "app.py", "--server.port", str(PORT_TEACHER), "--server.headless", "true"])
-    except:
-        print("❌ Streamlit not found")
+        await wait_port("127.0.0.1", PORT_TEACHER, proc)
+    except ServiceError as e:
+        raise ServiceError(f"❌ Teacher portal failed: {e}") from None
+    return proc
 
-if __name__ == "__main__":
-    print("\n" + "="*70)
-    print("🚀 " + " "*20 + "RubriqAI Platform" + " "*20 + "🚀")
-    print("="*70)
-    
-    print("\n📊 Starting all services...\n")
-    
-    # Start all services
-    threading.Thread(target=start_student_portal, daemon=True).start()
-    time.sleep(0.5)
-    threading.Thread(target=start_api, daemon=True).start()
-    time.sleep(1)
-    
+def print_banner():
     print(f"✅ Student Portal:  http://localhost:{PORT_STUDENT}/student.html")
     print("✅ API Bridge:      http://localhost:{}".format(PORT_API))
     print("✅ Teacher Portal:  http://localhost:{}".format(PORT_TEACHER))
-    
+
     print("\n" + "="*70)
     print("🎓 HOW IT WORKS:")
     print("  1. Teachers → http://localhost:{}".format(PORT_TEACHER))
@@ -78,16 +96,58 @@ if __name__ == "__main__":
     print("     - Take test")
     print("     - Submit answers")
     print("="*70 + "\n")
-    
-    time.sleep(0.5)
-    webbrowser.open(f"http://localhost:{PORT_TEACHER}")
-    
-    print("⌨️  Press Ctrl+C to stop all servers\n")
-    
+
+async def supervise():
+    """Start every service, then run until one of them stops; the others are shut down with it"""
+    procs = {}  # service name -> subprocess, registered as soon as it is spawned
+    httpd = start_student_portal()
+    portal = asyncio.ensure_future(asyncio.to_thread(httpd.serve_forever))
+    try:
+        # API and teacher portal start concurrently; each is ready once its port accepts connections
+        starts = [asyncio.ensure_future(start_api(procs)), asyncio.ensure_future(start_teacher(procs))]
+        try:
+            await asyncio.gather(*starts)
+        finally:
+            for task in starts:
+                task.cancel()
+
+        print_banner()
+        webbrowser.open(f"http://localhost:{PORT_TEACHER}")
+        print("⌨️  Press Ctrl+C to stop all servers\n")
+
+        watchers = {asyncio.ensure_future(proc.wait()): name for name, proc in procs.items()}
+        watchers[portal] = "Student portal"
+        done, _ = await asyncio.wait(watchers, return_when=asyncio.FIRST_COMPLETED)
+        stopped = done.pop()
+        if stopped is portal:
+            raise ServiceError("⚠️  Student portal stopped")
+        raise ServiceError(f"⚠️  {watchers[stopped]} stopped (exit code {stopped.result()})")
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+        for proc in procs.values():
+            if proc.returncode is None:
+                proc.terminate()
+        for proc in procs.values():
+            try:
+                await asyncio.wait_for(proc.wait(), timeout=5)
+            except asyncio.TimeoutError:
+                proc.kill()
+
+if __name__ == "__main__":
+    print("\n" + "="*70)
+    print("🚀 " + " "*20 + "RubriqAI Platform" + " "*20 + "🚀")
+    print("="*70)
+
+    print("\n📊 Starting all services...\n")
+
     try:
-        start_teacher()
+        asyncio.run(supervise())
     except KeyboardInterrupt:
         print("\n" + "="*70)
         print("👋 Shutting down RubriqAI...")
         print("="*70 + "\n")
         sys.exit(0)
+    except (ServiceError, OSError) as e:
+        print(e)
+        sys.exit(1)
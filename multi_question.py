@@ -18,24 +18,33 @@ class MultiQuestionAssignment:
         self.questions = []
         self.rubric = None  # Single rubric for all questions
         self.max_marks_per_question = 0
+        self._formatted_rubric = None  # Memoized format_rubric_for_evaluation() output
     
     def set_rubric(self, rubric_df: pd.DataFrame):
         """
         Set the rubric that will be used for all questions.
         
         Args:
-            rubric_df: DataFrame with CRITERIA and TOTAL MARKS columns
+            rubric_df: pandas or polars DataFrame with CRITERIA and TOTAL MARKS columns
         """
-        self.rubric = rubric_df.copy()
-        self.max_marks_per_question = self._calculate_max_marks(rubric_df)
+        # Polars frames are converted once; to_pandas() already returns a fresh frame
+        if hasattr(rubric_df, "to_pandas"):
+            self.rubric = rubric_df.to_pandas()
+        else:
+            self.rubric = rubric_df.copy()
+        self.max_marks_per_question = self._calculate_max_marks(self.rubric)
+        self._formatted_rubric = None
     
     def _calculate_max_marks(self, rubric_df: pd.DataFrame) -> int:
         """Calculate total max marks from rubric."""
-        total = 0
-        for idx, row in rubric_df.iterrows():
-            if pd.notna(row['TOTAL MARKS']) and str(row['CRITERIA']).strip():
-                total += int(row['TOTAL MARKS'])
-        return total
+        valid = self._valid_rubric_rows(rubric_df)
+        return int(valid['TOTAL MARKS'].astype(int).sum())
+    
+    @staticmethod
+    def _valid_rubric_rows(rubric_df: pd.DataFrame) -> pd.DataFrame:
+        """Rows with a non-blank criterion and a marks value."""
+        mask = rubric_df['CRITERIA'].astype(str).str.strip().ne('') & rubric_df['TOTAL MARKS'].notna()
+        return rubric_df.loc[mask]
     
     def add_question(self, question_text: str) -> int:
         """
@@ -86,14 +95,14 @@ class MultiQuestionAssignment:
         if self.rubric is None:
             return ""
         
-        rubric_formatted = "RUBRIC (applies to each question):\n\n"
-        for idx, row in self.rubric.iterrows():
-            if str(row['CRITERIA']).strip() and pd.notna(row['TOTAL MARKS']):
-                rubric_formatted += f"Criterion: {row['CRITERIA']}\n"
-                rubric_formatted += f"Maximum Marks: {row['TOTAL MARKS']}\n"
-                rubric_formatted += "---\n"
-        
-        return rubric_formatted
+        # Called once per graded answer; rebuilt only after set_rubric()
+        if self._formatted_rubric is None:
+            valid = self._valid_rubric_rows(self.rubric)
+            self._formatted_rubric = "RUBRIC (applies to each question):\n\n" + "".join(
+                f"Criterion: {criteria}\nMaximum Marks: {marks}\n---\n"
+                for criteria, marks in zip(valid['CRITERIA'], valid['TOTAL MARKS'])
+            )
+        return self._formatted_rubric
     
     def to_dict(self) -> Dict:
         """Convert assignment to dictionary for saving."""
@@ -4,20 +4,11 @@ Prompt templates for rubric-based evaluation.
 """
 
 
-def build_prompt(question: str, rubric: str, answer: str) -> str:
-    """
-    Builds structured evaluation prompt.
-    
-    Args:
-        question: The question being answered
-        rubric: The evaluation rubric (formatted)
-        answer: The student's answer
-        
-    Returns:
-        str: Complete evaluation prompt
-    """
-    return f"""
-You are a strict academic evaluator with expertise in all subjects including mathematics.
+# -----------------------------------------------------------------------------
+# Answer Evaluation
+# -----------------------------------------------------------------------------
+
+EVALUATION_RULES = """You are a strict academic evaluator with expertise in all subjects including mathematics.
 
 🔴 CRITICAL RULES FOR MATHEMATICAL ACCURACY - READ CAREFULLY:
 1. Mathematical calculations MUST be EXACTLY correct - ZERO tolerance for arithmetic errors
@@ -32,17 +23,9 @@ You are a strict academic evaluator with expertise in all subjects including mat
 6. If the math is wrong, the entire answer is wrong - no exceptions
 7. "Close enough" does NOT exist in mathematics - only correct or incorrect
 
-For non-mathematical content, evaluate normally based on rubric criteria.
-
-Question:
-{question}
-
-{rubric}
+For non-mathematical content, evaluate normally based on rubric criteria."""
 
-Student Answer:
-{answer}
-
-EVALUATION INSTRUCTIONS:
+EVALUATION_GUIDELINES = """EVALUATION INSTRUCTIONS:
 For each criterion, provide:
 1. A thorough analysis of what the student demonstrated
 2. Specific strengths with concrete examples from the answer
@@ -64,7 +47,19 @@ Example of GOOD reasoning:
 "The student demonstrates a solid foundational understanding by correctly identifying the three main stages of photosynthesis. They accurately explained the light-dependent reactions occurring in the thylakoids (mentioning chlorophyll and ATP production), which shows strong grasp of the biochemical process. However, the explanation of the Calvin Cycle lacks depth - while they mention carbon fixation, they omit the critical role of RuBisCO enzyme and the regeneration of RuBP. The answer would be strengthened by including the specific products at each stage and explaining the interdependence between the two reaction phases."
 
 Example of BAD reasoning:
-"Good answer but incomplete. Missing some details."
+"Good answer but incomplete. Missing some details.\""""
+
+
+# Constant parts of build_prompt(), assembled once at import
+_EVALUATION_PROMPT_HEADER = f"""
+{EVALUATION_RULES}
+
+Question:
+"""
+
+_EVALUATION_PROMPT_FOOTER = f"""
+
+{EVALUATION_GUIDELINES}
 
 Return ONLY valid JSON in this format:
 {{
@@ -78,6 +73,66 @@ Return ONLY valid JSON in this format:
 """
 
 
+def build_prompt(question: str, rubric: str, answer: str) -> str:
+    """
+    Builds structured evaluation prompt.
+    
+    Args:
+        question: The question being answered
+        rubric: The evaluation rubric (formatted)
+        answer: The student's answer
+        
+    Returns:
+        str: Complete evaluation prompt
+    """
+    return f"{_EVALUATION_PROMPT_HEADER}{question}\n\n{rubric}\n\nStudent Answer:\n{answer}{_EVALUATION_PROMPT_FOOTER}"
+
+
+def build_batch_prompt(questions: list, rubric: str, answers: list) -> str:
+    """
+    Builds one evaluation prompt covering several questions answered by the same student.
+
+    Args:
+        questions: Question texts, in order
+        rubric: The evaluation rubric (formatted), shared by every question
+        answers: The student's answers, aligned with questions
+
+    Returns:
+        str: Complete evaluation prompt asking for one result per question
+    """
+    pairs_text = "\n\n".join(
+        f"Q{i}:\n{question}\n\nA{i} (Student Answer):\n{answer}"
+        for i, (question, answer) in enumerate(zip(questions, answers), 1)
+    )
+
+    return f"""
+{EVALUATION_RULES}
+
+The student answered {len(questions)} questions below. Evaluate EACH answer independently against the rubric.
+
+{rubric}
+
+{pairs_text}
+
+{EVALUATION_GUIDELINES}
+
+Return ONLY valid JSON in this format, with exactly one entry in "results" per question, in order (Q1 first):
+{{
+  "results": [
+    {{
+      "question": 1,
+      "scores": [
+        {{"criterion": "...", "awarded": X, "max": Y, "reason": "detailed, specific, constructive explanation here"}}
+      ],
+      "total_score": Z,
+      "feedback": ["specific improvement point 1", "specific improvement point 2", "specific strength to maintain"],
+      "confidence": "High/Medium/Low"
+    }}
+  ]
+}}
+"""
+
+
 # -----------------------------------------------------------------------------
 # Model Answer Key Generation
 # -----------------------------------------------------------------------------
@@ -103,30 +158,23 @@ The answer should serve as:
 Write the model answer as if you are an expert student who fully understands the material."""
 
 
-def build_model_answer_prompt(question: str, rubric: str) -> str:
-    """
-    Build a prompt to generate an ideal model answer for a given question.
-    
-    Args:
-        question: The question to answer
-        rubric: The evaluation rubric (formatted)
-        
-    Returns:
-        str: Prompt for generating model answer
-    """
-    return f"""You are an experienced educator creating a model answer key.
+_MODEL_ANSWER_PROMPT_HEADER = f"""You are an experienced educator creating a model answer key.
 
 {MODEL_ANSWER_INSTRUCTIONS}
 
 ---
 QUESTION
 ---
-{question}
+"""
+
+_MODEL_ANSWER_PROMPT_RUBRIC = """
 
 ---
 RUBRIC (Your answer must address all these criteria to receive maximum marks)
 ---
-{rubric}
+"""
+
+_MODEL_ANSWER_PROMPT_FOOTER = """
 
 ---
 TASK
@@ -137,6 +185,20 @@ Return ONLY the model answer text. No JSON, no meta-commentary, just the answer
 Write as if you are an excellent student demonstrating perfect understanding."""
 
 
+def build_model_answer_prompt(question: str, rubric: str) -> str:
+    """
+    Build a prompt to generate an ideal model answer for a given question.
+    
+    Args:
+        question: The question to answer
+        rubric: The evaluation rubric (formatted)
+        
+    Returns:
+        str: Prompt for generating model answer
+    """
+    return f"{_MODEL_ANSWER_PROMPT_HEADER}{question}{_MODEL_ANSWER_PROMPT_RUBRIC}{rubric}{_MODEL_ANSWER_PROMPT_FOOTER}"
+
+
 # -----------------------------------------------------------------------------
 # AI Rubric Generation
 # -----------------------------------------------------------------------------
@@ -178,24 +240,14 @@ MARK ALLOCATION GUIDELINES:
 - Essay questions: 20-30 marks total"""
 
 
-def build_rubric_generation_prompt(questions: list) -> str:
-    """
-    Build a prompt to generate an optimal rubric from questions.
-    
-    Args:
-        questions: List of question texts
-        
-    Returns:
-        str: Prompt for generating rubric
-    """
-    questions_text = "\n".join([f"{i+1}. {q}" for i, q in enumerate(questions)])
-    
-    return f"""{RUBRIC_GENERATION_INSTRUCTIONS}
+_RUBRIC_GENERATION_PROMPT_HEADER = f"""{RUBRIC_GENERATION_INSTRUCTIONS}
 
 ---
 QUESTIONS TO ANALYZE
 ---
-{questions_text}
+"""
+
+_RUBRIC_GENERATION_PROMPT_FOOTER = """
 
 ---
 TASK
@@ -211,6 +263,21 @@ Consider:
 Return ONLY the JSON array of criteria. No explanations, no markdown, just the JSON array."""
 
 
+def build_rubric_generation_prompt(questions: list) -> str:
+    """
+    Build a prompt to generate an optimal rubric from questions.
+    
+    Args:
+        questions: List of question texts
+        
+    Returns:
+        str: Prompt for generating rubric
+    """
+    questions_text = "\n".join(f"{i}. {q}" for i, q in enumerate(questions, 1))
+    
+    return f"{_RUBRIC_GENERATION_PROMPT_HEADER}{questions_text}{_RUBRIC_GENERATION_PROMPT_FOOTER}"
+
+
 RUBRIC_ANALYSIS_INSTRUCTIONS = """You are an expert educator reviewing and improving evaluation rubrics.
 
 Your task: Analyze the current rubric and questions, then suggest improvements.
@@ -248,35 +315,21 @@ Return a JSON object with analysis and suggestions:
 }}"""
 
 
-def build_rubric_analysis_prompt(questions: list, current_rubric: list) -> str:
-    """
-    Build a prompt to analyze and improve existing rubric.
-    
-    Args:
-        questions: List of question texts
-        current_rubric: Current rubric as list of dicts with criterion and marks
-        
-    Returns:
-        str: Prompt for analyzing rubric
-    """
-    questions_text = "\n".join([f"{i+1}. {q}" for i, q in enumerate(questions)])
-    
-    rubric_text = "\n".join([
-        f"- {r.get('criterion', r.get('CRITERIA', 'Unknown'))}: {r.get('marks', r.get('TOTAL MARKS', 0))} marks"
-        for r in current_rubric
-    ])
-    
-    return f"""{RUBRIC_ANALYSIS_INSTRUCTIONS}
+_RUBRIC_ANALYSIS_PROMPT_HEADER = f"""{RUBRIC_ANALYSIS_INSTRUCTIONS}
 
 ---
 QUESTIONS
 ---
-{questions_text}
+"""
+
+_RUBRIC_ANALYSIS_PROMPT_RUBRIC = """
 
 ---
 CURRENT RUBRIC
 ---
-{rubric_text}
+"""
+
+_RUBRIC_ANALYSIS_PROMPT_FOOTER = """
 
 ---
 TASK
@@ -290,3 +343,24 @@ Consider:
 - Could any criteria be improved or consolidated?
 
 Return ONLY the JSON object. No markdown, no explanations, just the JSON."""
+
+
+def build_rubric_analysis_prompt(questions: list, current_rubric: list) -> str:
+    """
+    Build a prompt to analyze and improve existing rubric.
+    
+    Args:
+        questions: List of question texts
+        current_rubric: Current rubric as list of dicts with criterion and marks
+        
+    Returns:
+        str: Prompt for analyzing rubric
+    """
+    questions_text = "\n".join(f"{i}. {q}" for i, q in enumerate(questions, 1))
+    
+    rubric_text = "\n".join(
+        f"- {r.get('criterion', r.get('CRITERIA', 'Unknown'))}: {r.get('marks', r.get('TOTAL MARKS', 0))} marks"
+        for r in current_rubric
+    )
+    
+    return f"{_RUBRIC_ANALYSIS_PROMPT_HEADER}{questions_text}{_RUBRIC_ANALYSIS_PROMPT_RUBRIC}{rubric_text}{_RUBRIC_ANALYSIS_PROMPT_FOOTER}"
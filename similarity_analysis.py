@@ -2,11 +2,81 @@
 similarity_analysis.py - Answer Similarity, Performance Analytics, Confidence Scoring & AI Detection
 """
 
+import hashlib
+import threading
+from collections import OrderedDict
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.feature_extraction.text import CountVectorizer, HashingVectorizer, TfidfTransformer, TfidfVectorizer
+from sklearn.pipeline import make_pipeline
 from sklearn.metrics.pairwise import cosine_similarity
 import pandas as pd
 import re
+from bisect import bisect_right
+from joblib import Parallel, delayed
+
+
+# Common words ignored by the word-overlap similarity
+_STOPWORDS = frozenset({
+    'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'from',
+    'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had'
+})
+
+# Band lookups: bisect_right(THRESHOLDS, value) indexes the matching table entry (lower bounds inclusive)
+_CONFIDENCE_THRESHOLDS = (60, 75, 90)
+_CONFIDENCE_BANDS = (
+    ("Low", "Manual review recommended", "#ff8844"),  # Orange
+    ("Moderate", "Consider quick review", "#ffbb44"),  # Yellow
+    ("High", "Grade is reliable", "#88ff44"),  # Light green
+    ("Very High", "Trust this grade", "#44ff88"),  # Green
+)
+
+_AI_RECOMMENDATION_THRESHOLDS = (40, 60, 75)
+_AI_RECOMMENDATIONS = (
+    "Appears to be student's own work",
+    "Some AI indicators - Monitor",
+    "Possible AI use - Consider reviewing",
+    "High likelihood of AI use - Review manually and discuss with student",
+)
+
+_SIMILARITY_THRESHOLDS = (50, 65, 80)
+_SIMILARITY_COLORS = (
+    "#44ff88",  # Green - unique
+    "#ffbb44",  # Yellow - moderate
+    "#ff8844",  # Orange - suspicious
+    "#ff4444",  # Red - very suspicious
+)
+
+_DIFFICULTY_THRESHOLDS = (40, 60, 80)
+_DIFFICULTY_LABELS = ("Very Hard", "Hard", "Moderate", "Easy")
+
+_STRENGTH_THRESHOLDS = (50, 65, 80)
+_STRENGTH_LABELS = ("Weak", "Adequate", "Good", "Strong")
+
+# Array forms of the tier tables, converted once instead of on every vectorized call
+_DIFFICULTY_THRESHOLD_ARRAY = np.array(_DIFFICULTY_THRESHOLDS, dtype=np.float64)
+_DIFFICULTY_LABEL_ARRAY = np.array(_DIFFICULTY_LABELS, dtype=object)
+_STRENGTH_THRESHOLD_ARRAY = np.array(_STRENGTH_THRESHOLDS, dtype=np.float64)
+_STRENGTH_LABEL_ARRAY = np.array(_STRENGTH_LABELS, dtype=object)
+
+
+def _classify(values, thresholds, labels):
+    """Vectorized bisect_right: lower bounds are inclusive, as in the scalar lookups; NaN gets the lowest tier"""
+    values = np.asarray(values, dtype=np.float64)
+    tiers = np.searchsorted(thresholds, values, side='right')
+    return labels[np.where(np.isnan(values), 0, tiers)]
+
+
+def classify_strength(avg_percentages):
+    """
+    Class strength label for each average percentage, in one vectorized lookup
+    
+    Args:
+        avg_percentages: Array-like of average percentages (e.g. a pandas column)
+    
+    Returns:
+        Object array of labels ("Weak", "Adequate", "Good", "Strong")
+    """
+    return _classify(avg_percentages, _STRENGTH_THRESHOLD_ARRAY, _STRENGTH_LABEL_ARRAY)
 
 
 class ConfidenceAnalyzer:
@@ -51,17 +121,19 @@ class ConfidenceAnalyzer:
         # Factor 2: Rubric criteria coverage
         scores = evaluation_result.get('scores', [])
         if scores:
-            awarded = [s.get('awarded', 0) for s in scores]
-            max_scores = [s.get('max', 1) for s in scores]
+            # Criterion percentages computed once for Factors 2 and 3; a missing max is NaN here
+            awarded = np.fromiter((s.get('awarded', 0) for s in scores), dtype=np.float64, count=len(scores))
+            given_max = np.fromiter((s.get('max', np.nan) for s in scores), dtype=np.float64, count=len(scores))
+            max_scores = np.where(np.isnan(given_max), 1, given_max)
+            has_marks = max_scores > 0
+            percentages = np.where(has_marks, awarded / np.where(has_marks, max_scores, 1) * 100, 0)
             
             # Check if all criteria addressed
-            percentages = [(a/m*100) if m > 0 else 0 for a, m in zip(awarded, max_scores)]
-            
-            if all(p > 0 for p in percentages):
+            if (percentages > 0).all():
                 confidence_factors.append(90)
                 weights.append(0.25)
                 reasons.append("All rubric criteria addressed")
-            elif any(p > 0 for p in percentages):
+            elif (percentages > 0).any():
                 confidence_factors.append(70)
                 weights.append(0.25)
                 reasons.append("Some criteria not fully addressed")
@@ -72,9 +144,9 @@ class ConfidenceAnalyzer:
         
         # Factor 3: Score distribution (balanced scoring = more confident)
         if scores:
-            percentages = [(s.get('awarded', 0)/s.get('max', 1)*100) if s.get('max', 0) > 0 else 0 
-                          for s in scores]
-            std_dev = np.std(percentages) if len(percentages) > 1 else 0
+            # A criterion without a max counts as 0% here (Factor 2 treats its max as 1)
+            spread = np.where(np.isnan(given_max), 0, percentages)
+            std_dev = spread.std() if len(spread) > 1 else 0
             
             if std_dev < 15:  # Consistent scoring
                 confidence_factors.append(85)
@@ -125,33 +197,16 @@ class ConfidenceAnalyzer:
         
         # Calculate weighted average
         if confidence_factors and weights:
-            # Normalize weights
+            # Normalize weights inline (same arithmetic, no intermediate list)
             total_weight = sum(weights)
-            normalized_weights = [w/total_weight for w in weights]
-            
-            confidence_score = sum(c * w for c, w in zip(confidence_factors, normalized_weights))
+            confidence_score = sum(c * (w / total_weight) for c, w in zip(confidence_factors, weights))
             confidence_score = round(confidence_score, 1)
         else:
             confidence_score = 75.0
             reasons = ["Standard confidence level"]
         
         # Determine confidence level
-        if confidence_score >= 90:
-            level = "Very High"
-            recommendation = "Trust this grade"
-            color = "#44ff88"  # Green
-        elif confidence_score >= 75:
-            level = "High"
-            recommendation = "Grade is reliable"
-            color = "#88ff44"  # Light green
-        elif confidence_score >= 60:
-            level = "Moderate"
-            recommendation = "Consider quick review"
-            color = "#ffbb44"  # Yellow
-        else:
-            level = "Low"
-            recommendation = "Manual review recommended"
-            color = "#ff8844"  # Orange
+        level, recommendation, color = _CONFIDENCE_BANDS[bisect_right(_CONFIDENCE_THRESHOLDS, confidence_score)]
         
         return {
             'confidence_score': confidence_score,
@@ -166,6 +221,9 @@ class ConfidenceAnalyzer:
 class AIWritingDetector:
     """Detects AI-generated answers (ChatGPT, Claude, etc.)"""
     
+    # Profiling one answer takes microseconds, so worker processes only pay off for large histories
+    PARALLEL_BASELINE_MIN_ANSWERS = 5000
+    
     def __init__(self):
         self.ai_indicators = {
             # Common AI phrases
@@ -174,6 +232,16 @@ class AIWritingDetector:
             'hedging': ['arguably', 'potentially', 'presumably', 'seemingly', 'apparently'],
             'perfect_structure': ['firstly', 'secondly', 'thirdly', 'finally', 'in conclusion']
         }
+        
+        # One pass over the text finds every indicator phrase; the zero-width lookahead also
+        # reports occurrences that overlap another phrase, matching per-phrase substring checks
+        self._indicator_categories = {}
+        for category, phrases in self.ai_indicators.items():
+            for phrase in phrases:
+                self._indicator_categories.setdefault(phrase, []).append(category)
+        self._indicator_re = re.compile(
+            "(?=(" + "|".join(map(re.escape, sorted(self._indicator_categories, key=len, reverse=True))) + "))"
+        )
     
     def analyze_answer(self, answer, student_baseline=None):
         """
@@ -197,44 +265,45 @@ class AIWritingDetector:
         indicators = []
         score = 0
         
+        # Split once; the same pieces feed the text statistics and the checks below
+        words = answer.split()
+        sentences = [s.strip() for s in answer.split('.') if s.strip()]
+        
         # Analyze text characteristics
-        text_stats = self._analyze_text_characteristics(answer)
+        text_stats = self._analyze_text_characteristics(answer, words, sentences)
+        answer_lower = answer.lower()
+        found_counts = self._count_indicator_phrases(answer_lower)
         
         # Check 1: Excessive formal transitions
-        formal_count = sum(1 for phrase in self.ai_indicators['formal_transitions'] 
-                          if phrase in answer.lower())
+        formal_count = found_counts.get('formal_transitions', 0)
         if formal_count >= 3:
             score += 25
             indicators.append(f"Excessive formal transitions ({formal_count} found)")
         
         # Check 2: AI-specific patterns
-        pattern_count = sum(1 for phrase in self.ai_indicators['ai_patterns'] 
-                           if phrase in answer.lower())
+        pattern_count = found_counts.get('ai_patterns', 0)
         if pattern_count >= 2:
             score += 30
             indicators.append(f"AI-typical phrases detected ({pattern_count} found)")
         
-        # Check 3: Perfect grammar (no contractions, typos)
-        has_contractions = any(word in answer for word in ["don't", "can't", "won't", "it's", "that's"])
-        has_informal = any(word in answer.lower() for word in ["gonna", "wanna", "gotta", "yeah", "ok", "like,"])
-        
-        if not has_contractions and not has_informal and len(answer) > 100:
+        # Check 3: Perfect grammar (no contractions, typos); the length gate skips the scans for short answers
+        if (len(answer) > 100
+                and not any(word in answer for word in ["don't", "can't", "won't", "it's", "that's"])
+                and not any(word in answer_lower for word in ["gonna", "wanna", "gotta", "yeah", "ok", "like,"])):
             score += 20
             indicators.append("Unusually perfect grammar - no contractions or informal language")
         
         # Check 4: Sentence length consistency (AI tends to be very consistent)
-        sentences = [s.strip() for s in answer.split('.') if s.strip()]
         if len(sentences) >= 3:
-            lengths = [len(s.split()) for s in sentences]
-            std_dev = np.std(lengths)
+            lengths = np.fromiter((len(s.split()) for s in sentences), dtype=np.int32, count=len(sentences))
+            std_dev = lengths.std()
             
             if std_dev < 3:  # Very consistent length
                 score += 15
                 indicators.append("Extremely consistent sentence lengths")
         
         # Check 5: Over-structured (intro-body-conclusion in short answer)
-        has_structure = any(phrase in answer.lower() 
-                           for phrase in self.ai_indicators['perfect_structure'])
+        has_structure = found_counts.get('perfect_structure', 0) > 0
         if has_structure and len(answer) < 300:
             score += 20
             indicators.append("Over-structured for answer length")
@@ -247,7 +316,6 @@ class AIWritingDetector:
                 indicators.extend(baseline_comparison['differences'])
         
         # Check 7: Vocabulary sophistication
-        words = answer.split()
         long_words = [w for w in words if len(w) > 10]
         if len(long_words) / len(words) > 0.15:  # More than 15% long words
             score += 15
@@ -273,17 +341,31 @@ class AIWritingDetector:
             'recommendation': self._get_recommendation(score)
         }
     
-    def _analyze_text_characteristics(self, text):
-        """Extract text statistics"""
-        words = text.split()
-        sentences = [s for s in text.split('.') if s.strip()]
+    def _count_indicator_phrases(self, text_lower):
+        """Number of distinct indicator phrases present in the lowercased text, per category"""
+        found = set(self._indicator_re.findall(text_lower))
+        counts = {}
+        for phrase in found:
+            for category in self._indicator_categories[phrase]:
+                counts[category] = counts.get(category, 0) + 1
+        return counts
+    
+    def _analyze_text_characteristics(self, text, words=None, sentences=None):
+        """Extract text statistics (words/sentences may be passed in when the caller already split the text)"""
+        if words is None:
+            words = text.split()
+        word_lengths = np.fromiter(map(len, words), dtype=np.int32, count=len(words))
+        if sentences is None:
+            sentence_count = sum(1 for s in text.split('.') if s.strip())
+        else:
+            sentence_count = len(sentences)
         
         return {
             'word_count': len(words),
-            'sentence_count': len(sentences),
-            'avg_sentence_length': len(words) / len(sentences) if sentences else 0,
-            'avg_word_length': sum(len(w) for w in words) / len(words) if words else 0,
-            'has_contractions': any("'" in w for w in words),
+            'sentence_count': sentence_count,
+            'avg_sentence_length': len(words) / sentence_count if sentence_count else 0,
+            'avg_word_length': float(word_lengths.mean()) if words else 0,
+            'has_contractions': "'" in text,  # Words never contain whitespace, so one scan of the text suffices
             'has_questions': '?' in text,
             'has_exclamations': '!' in text
         }
@@ -310,14 +392,7 @@ class AIWritingDetector:
     
     def _get_recommendation(self, score):
         """Get recommendation based on score"""
-        if score >= 75:
-            return "High likelihood of AI use - Review manually and discuss with student"
-        elif score >= 60:
-            return "Possible AI use - Consider reviewing"
-        elif score >= 40:
-            return "Some AI indicators - Monitor"
-        else:
-            return "Appears to be student's own work"
+        return _AI_RECOMMENDATIONS[bisect_right(_AI_RECOMMENDATION_THRESHOLDS, score)]
     
     def create_student_baseline(self, previous_answers):
         """
@@ -332,7 +407,12 @@ class AIWritingDetector:
         if not previous_answers or len(previous_answers) < 2:
             return None
         
-        all_stats = [self._analyze_text_characteristics(ans) for ans in previous_answers]
+        if len(previous_answers) >= self.PARALLEL_BASELINE_MIN_ANSWERS:
+            all_stats = Parallel(n_jobs=-1, prefer='processes', batch_size='auto')(
+                delayed(self._analyze_text_characteristics)(ans) for ans in previous_answers
+            )
+        else:
+            all_stats = [self._analyze_text_characteristics(ans) for ans in previous_answers]
         
         return {
             'avg_sentence_length': np.mean([s['avg_sentence_length'] for s in all_stats]),
@@ -345,6 +425,12 @@ class AIWritingDetector:
 class SimilarityAnalyzer:
     """Analyzes answer similarity to detect potential plagiarism"""
     
+    # Fitted TF-IDF matrices keyed by (vectorizer kind, corpus hash). Shared by all instances,
+    # since the app creates a new analyzer on every rerun; least recently used entries are evicted.
+    TFIDF_CACHE_SIZE = 32
+    _tfidf_cache = OrderedDict()
+    _tfidf_cache_lock = threading.Lock()
+    
     def __init__(self):
         # Use multiple vectorizers for better detection
         self.vectorizer_word = TfidfVectorizer(
@@ -352,14 +438,31 @@ class SimilarityAnalyzer:
             strip_accents='unicode',
             ngram_range=(1, 3),  # Unigrams, bigrams, trigrams
             min_df=1,
-            max_df=0.95
+            max_df=0.95,
+            dtype=np.float32  # Halves the sparse payload; scores are only shown to one decimal
         )
         
-        self.vectorizer_char = TfidfVectorizer(
+        # Character n-grams are hashed instead of kept in a vocabulary; the raw counts go
+        # through the same IDF weighting and L2 norm a TfidfVectorizer would apply
+        self.vectorizer_char = make_pipeline(
+            HashingVectorizer(
+                lowercase=True,
+                analyzer='char',
+                ngram_range=(3, 5),  # Character-level n-grams
+                n_features=2**20,
+                alternate_sign=False,
+                norm=None,
+                dtype=np.float32
+            ),
+            TfidfTransformer()
+        )
+        
+        # Per-question word vectorizer; fitted on that question's answers alone
+        self.vectorizer_question = TfidfVectorizer(
             lowercase=True,
-            analyzer='char',
-            ngram_range=(3, 5),  # Character-level n-grams
-            min_df=1
+            ngram_range=(1, 3),
+            min_df=1,
+            dtype=np.float32
         )
     
     def calculate_similarity_matrix(self, students_answers):
@@ -375,42 +478,30 @@ class SimilarityAnalyzer:
         if len(students_answers) < 2:
             return None
         
-        # Combine all answers for each student into single text
-        student_names = []
-        combined_answers = []
-        
-        for student in students_answers:
-            student_names.append(student['student_name'])
-            # Combine all answers into one text
-            answers_list = [str(ans).strip() for ans in student['answers'].values() if ans]
-            combined_text = " ".join(answers_list)
-            combined_answers.append(combined_text)
+        # Combine all answers for each student into single text, built once and shared by every method below
+        student_names = [student['student_name'] for student in students_answers]
+        combined_answers = [
+            " ".join(str(ans).strip() for ans in student['answers'].values() if ans)
+            for student in students_answers
+        ]
         
         # Calculate similarity using multiple methods and take the maximum
         try:
+            # Identical texts give identical rows, so pairwise scores are computed once per distinct
+            # text and expanded back; IDF weights are still fitted on the full class
+            first, inverse = self._unique_texts(combined_answers)
+            expand = np.ix_(inverse, inverse)
+            
             # Method 1: Word-level TF-IDF
-            tfidf_word = self.vectorizer_word.fit_transform(combined_answers)
-            similarity_word = cosine_similarity(tfidf_word)
+            tfidf_word = self._fit_tfidf('word', self.vectorizer_word, combined_answers)
+            similarity_word = cosine_similarity(tfidf_word[first])[expand]
             
             # Method 2: Character-level TF-IDF (catches paraphrasing)
-            tfidf_char = self.vectorizer_char.fit_transform(combined_answers)
-            similarity_char = cosine_similarity(tfidf_char)
+            tfidf_char = self._fit_tfidf('char', self.vectorizer_char, combined_answers)
+            similarity_char = cosine_similarity(tfidf_char[first])[expand]
             
             # Method 3: Simple word overlap (catches direct copying)
-            similarity_overlap = np.zeros((len(combined_answers), len(combined_answers)))
-            for i in range(len(combined_answers)):
-                for j in range(len(combined_answers)):
-                    if i != j:
-                        words_i = set(combined_answers[i].lower().split())
-                        words_j = set(combined_answers[j].lower().split())
-                        # Remove common words
-                        common_words = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'from', 'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had'}
-                        words_i = words_i - common_words
-                        words_j = words_j - common_words
-                        
-                        if len(words_i) > 0 and len(words_j) > 0:
-                            overlap = len(words_i & words_j) / min(len(words_i), len(words_j))
-                            similarity_overlap[i][j] = overlap
+            similarity_overlap = self._word_overlap_matrix([combined_answers[i] for i in first])[expand]
             
             # Combine methods: take weighted average with emphasis on higher scores
             # This makes the detector more sensitive to copying
@@ -422,31 +513,22 @@ class SimilarityAnalyzer:
             
             # Apply amplification to make differences more visible
             # Scores below 0.3 stay low, scores above 0.5 get boosted
-            for i in range(len(similarity_matrix)):
-                for j in range(len(similarity_matrix)):
-                    score = similarity_matrix[i][j]
-                    if i != j:  # Don't modify diagonal
-                        if score > 0.5:
-                            # Amplify high similarities
-                            similarity_matrix[i][j] = min(0.95, score * 1.3)
-                        elif score > 0.3:
-                            # Moderate amplification
-                            similarity_matrix[i][j] = score * 1.1
+            similarity_matrix = np.where(
+                similarity_matrix > 0.5,
+                np.minimum(0.95, similarity_matrix * 1.3),  # Amplify high similarities
+                np.where(similarity_matrix > 0.3, similarity_matrix * 1.1, similarity_matrix)  # Moderate amplification
+            )
             
-            # Create DataFrame
+            # Ensure diagonal is 100% once converted
+            np.fill_diagonal(similarity_matrix, 1.0)
+            
+            # Create DataFrame, converted to percentages
             df = pd.DataFrame(
-                similarity_matrix,
+                similarity_matrix * 100,
                 index=student_names,
                 columns=student_names
             )
             
-            # Convert to percentages
-            df = df * 100
-            
-            # Ensure diagonal is 100%
-            for name in student_names:
-                df.loc[name, name] = 100.0
-            
             return df
             
         except Exception as e:
@@ -455,6 +537,76 @@ class SimilarityAnalyzer:
             traceback.print_exc()
             return None
     
+    def _fit_tfidf(self, kind, vectorizer, texts):
+        """
+        TF-IDF matrix of texts, reusing the result of an earlier fit on the same corpus
+        
+        Args:
+            kind: Name of the vectorizer configuration ('word', 'char' or 'question')
+            vectorizer: Unfitted vectorizer for that configuration
+            texts: Documents to vectorize
+        
+        Returns:
+            Sparse TF-IDF matrix (shared with the cache; do not modify)
+        """
+        corpus_hash = hashlib.blake2b(digest_size=16)
+        for text in texts:
+            encoded = text.encode('utf-8')
+            corpus_hash.update(len(encoded).to_bytes(8, 'little'))
+            corpus_hash.update(encoded)
+        key = (kind, corpus_hash.digest())
+        
+        cache = SimilarityAnalyzer._tfidf_cache
+        with SimilarityAnalyzer._tfidf_cache_lock:
+            if key in cache:
+                cache.move_to_end(key)
+                return cache[key]
+        
+        tfidf = vectorizer.fit_transform(texts)
+        with SimilarityAnalyzer._tfidf_cache_lock:
+            cache[key] = tfidf
+            while len(cache) > self.TFIDF_CACHE_SIZE:
+                cache.popitem(last=False)
+        return tfidf
+    
+    @staticmethod
+    def _unique_texts(texts):
+        """
+        Positions of the first occurrence of each distinct text, and each text's index into them
+        
+        Args:
+            texts: Documents, possibly with repeats (e.g. blank answers)
+        
+        Returns:
+            Tuple (first, inverse) of index arrays; texts[first[inverse[i]]] == texts[i]
+        """
+        seen = {}
+        inverse = np.fromiter((seen.setdefault(text, len(seen)) for text in texts), dtype=np.intp, count=len(texts))
+        first = np.empty(len(seen), dtype=np.intp)
+        first[inverse[::-1]] = np.arange(len(texts) - 1, -1, -1)
+        return first, inverse
+    
+    @staticmethod
+    def _word_overlap_matrix(texts):
+        """
+        Pairwise overlap of distinct non-common words: |A & B| / min(|A|, |B|)
+        
+        All pairs come from one sparse product of the binary document-word matrix. The diagonal
+        holds each text's overlap with itself (1, or 0 without any words); callers overwrite it.
+        """
+        # Same tokens as text.lower().split()
+        vectorizer = CountVectorizer(binary=True, lowercase=True, tokenizer=str.split, token_pattern=None,
+                                     stop_words=list(_STOPWORDS))
+        try:
+            words = vectorizer.fit_transform(texts)
+        except ValueError:
+            # Nothing but common words in any answer
+            return np.zeros((len(texts), len(texts)))
+        
+        word_counts = np.asarray(words.sum(axis=1)).ravel()
+        shared = (words @ words.T).toarray()
+        return shared / np.maximum(np.minimum.outer(word_counts, word_counts), 1)
+    
     def get_suspicious_pairs(self, similarity_df, threshold=70):
         """
         Get pairs of students with high similarity
@@ -469,21 +621,21 @@ class SimilarityAnalyzer:
         if similarity_df is None:
             return []
         
-        suspicious = []
+        # Upper triangle only (avoid duplicates), filtered in one vectorized pass
+        matrix = similarity_df.to_numpy()
+        rows, cols = np.triu_indices(matrix.shape[0], k=1)
+        values = matrix[rows, cols]
+        selected = values >= threshold
+        rows, cols = rows[selected], cols[selected]
+        values = np.round(values[selected], 1)
         
-        # Iterate through upper triangle (avoid duplicates)
-        for i in range(len(similarity_df.index)):
-            for j in range(i + 1, len(similarity_df.columns)):
-                similarity = similarity_df.iloc[i, j]
-                if similarity >= threshold:
-                    suspicious.append((
-                        similarity_df.index[i],
-                        similarity_df.columns[j],
-                        round(similarity, 1)
-                    ))
+        # Sort by similarity (highest first); stable, so ties keep row-major order
+        order = np.argsort(-values, kind='stable')
         
-        # Sort by similarity (highest first)
-        suspicious.sort(key=lambda x: x[2], reverse=True)
+        suspicious = [
+            (similarity_df.index[rows[k]], similarity_df.columns[cols[k]], values[k])
+            for k in order
+        ]
         
         return suspicious
     
@@ -514,26 +666,22 @@ class SimilarityAnalyzer:
             return None
         
         try:
-            # Word-level similarity
-            vectorizer = TfidfVectorizer(
-                lowercase=True,
-                ngram_range=(1, 3),
-                min_df=1
-            )
-            tfidf = vectorizer.fit_transform(question_answers)
-            similarity = cosine_similarity(tfidf)
+            # Word-level similarity (refits of the same answers are served from the TF-IDF cache)
+            tfidf = self._fit_tfidf('question', self.vectorizer_question, question_answers)
+            # Blank and boilerplate answers repeat; score each distinct answer once
+            first, inverse = self._unique_texts(question_answers)
+            similarity = cosine_similarity(tfidf[first])[np.ix_(inverse, inverse)] * 100
+            
+            # Ensure diagonal is 100% (one strided write instead of per-label .loc calls)
+            np.fill_diagonal(similarity, 100.0)
             
             # Create DataFrame
             df = pd.DataFrame(
-                similarity * 100,
+                similarity,
                 index=student_names,
                 columns=student_names
             )
             
-            # Ensure diagonal is 100%
-            for name in student_names:
-                df.loc[name, name] = 100.0
-            
             return df
             
         except Exception as e:
@@ -551,9 +699,10 @@ class SimilarityAnalyzer:
             return {'similarity': 0, 'matches': []}
         
         try:
-            # Calculate similarity
-            tfidf = self.vectorizer.fit_transform([answer1, answer2])
-            similarity = cosine_similarity(tfidf[0:1], tfidf[1:2])[0][0] * 100
+            # Calculate similarity on a fit of just this pair; rows are L2-normalized,
+            # so their dot product is the cosine
+            tfidf = TfidfVectorizer(lowercase=True).fit_transform([answer1, answer2])
+            similarity = (tfidf[0] @ tfidf[1].T).toarray()[0, 0] * 100
             
             # Find common significant words (beyond stop words)
             words1 = set(answer1.lower().split())
@@ -577,14 +726,7 @@ class SimilarityAnalyzer:
     
     def get_color_for_similarity(self, similarity):
         """Get color code for similarity percentage"""
-        if similarity >= 80:
-            return "#ff4444"  # Red - very suspicious
-        elif similarity >= 65:
-            return "#ff8844"  # Orange - suspicious
-        elif similarity >= 50:
-            return "#ffbb44"  # Yellow - moderate
-        else:
-            return "#44ff88"  # Green - unique
+        return _SIMILARITY_COLORS[bisect_right(_SIMILARITY_THRESHOLDS, similarity)]
 
 
 class PerformanceAnalyzer:
@@ -606,27 +748,30 @@ class PerformanceAnalyzer:
         if not evaluations:
             return None
         
-        # Extract scores
-        scores = [e['percentage'] for e in evaluations]
-        total_scores = [e['total_score'] for e in evaluations]
+        # Extract scores once into an array; every statistic below is a vectorized pass over it
+        scores = np.asarray([e['percentage'] for e in evaluations], dtype=np.float64)
+        min_score, median, max_score = np.percentile(scores, [0, 50, 100])
+        
+        # Grade bands: <60, 60-70, 70-80, 80-90, >=90
+        bands = np.bincount(np.digitize(scores, [60, 70, 80, 90]), minlength=5)
         
         analytics = {
             'total_students': len(evaluations),
-            'class_average': round(np.mean(scores), 1),
-            'median': round(np.median(scores), 1),
-            'std_dev': round(np.std(scores), 1),
-            'min_score': round(min(scores), 1),
-            'max_score': round(max(scores), 1),
-            'passing_rate': round(len([s for s in scores if s >= 60]) / len(scores) * 100, 1)
+            'class_average': round(scores.mean(), 1),
+            'median': round(median, 1),
+            'std_dev': round(scores.std(), 1),
+            'min_score': round(min_score, 1),
+            'max_score': round(max_score, 1),
+            'passing_rate': round((len(scores) - bands[0]) / len(scores) * 100, 1)
         }
         
         # Performance distribution
         analytics['distribution'] = {
-            'excellent': len([s for s in scores if s >= 90]),  # A
-            'good': len([s for s in scores if 80 <= s < 90]),  # B
-            'average': len([s for s in scores if 70 <= s < 80]),  # C
-            'below_average': len([s for s in scores if 60 <= s < 70]),  # D
-            'failing': len([s for s in scores if s < 60])  # F
+            'excellent': int(bands[4]),  # A
+            'good': int(bands[3]),  # B
+            'average': int(bands[2]),  # C
+            'below_average': int(bands[1]),  # D
+            'failing': int(bands[0])  # F
         }
         
         return analytics
@@ -641,7 +786,8 @@ class PerformanceAnalyzer:
         if not evaluations:
             return None
         
-        question_stats = {}
+        # One (question, score, max) row per graded answer
+        rows = []
         
         for eval_data in evaluations:
             individual_results = eval_data.get('individual_results', [])
@@ -654,36 +800,50 @@ class PerformanceAnalyzer:
                 if not q_num:
                     continue
                 
-                if q_num not in question_stats:
-                    question_stats[q_num] = {
-                        'scores': [],
-                        'max_score': 0
-                    }
-                
                 score = result.get('total_score', 0)
                 max_score = sum(s.get('max', 0) for s in result.get('scores', []))
-                
-                question_stats[q_num]['scores'].append(score)
-                question_stats[q_num]['max_score'] = max_score
+                rows.append((q_num, score, max_score))
+        
+        if not rows:
+            return {}
+        
+        # Calculate statistics for every question in one grouped pass
+        df = pd.DataFrame(rows, columns=['q', 'score', 'max'])
+        # The last max seen for a question is the one its scores are measured against
+        df['max'] = df.groupby('q', sort=False)['max'].transform('last')
+        df['pct'] = np.where(df['max'] > 0, df['score'] / df['max'].where(df['max'] > 0, 1) * 100, 0.0)
+        df['full_marks'] = df['score'] == df['max']
+        df['failed'] = df['pct'] < 50
+        
+        grouped = df.groupby('q', sort=False).agg(
+            average_score=('score', 'mean'),
+            average_percentage=('pct', 'mean'),
+            max_possible=('max', 'last'),
+            students_full_marks=('full_marks', 'sum'),
+            students_failed=('failed', 'sum')
+        )
+        # Difficulty tiers for every question in one lookup, binned like classify_strength
+        grouped['difficulty'] = _classify(
+            grouped['average_percentage'], _DIFFICULTY_THRESHOLD_ARRAY, _DIFFICULTY_LABEL_ARRAY
+        )
         
-        # Calculate statistics
         analysis = {}
-        for q_num, data in question_stats.items():
-            if not data['scores']:
-                continue
-            
-            scores = data['scores']
-            max_score = data['max_score']
-            
-            percentages = [(s / max_score * 100) if max_score > 0 else 0 for s in scores]
-            
+        for q_num, avg_score, avg_pct, max_score, full_marks, failed, difficulty in zip(
+            grouped.index.tolist(),
+            grouped['average_score'].to_numpy(),
+            grouped['average_percentage'].to_numpy(),
+            grouped['max_possible'].tolist(),
+            grouped['students_full_marks'].tolist(),
+            grouped['students_failed'].tolist(),
+            grouped['difficulty'].tolist()
+        ):
             analysis[q_num] = {
-                'average_score': round(np.mean(scores), 1),
-                'average_percentage': round(np.mean(percentages), 1),
+                'average_score': round(avg_score, 1),
+                'average_percentage': round(avg_pct, 1),
                 'max_possible': max_score,
-                'students_full_marks': len([s for s in scores if s == max_score]),
-                'students_failed': len([p for p in percentages if p < 50]),
-                'difficulty': self._calculate_difficulty(np.mean(percentages))
+                'students_full_marks': full_marks,
+                'students_failed': failed,
+                'difficulty': difficulty
             }
         
         return analysis
@@ -725,6 +885,7 @@ class PerformanceAnalyzer:
         
         # Calculate statistics
         analysis = {}
+        averages = {}
         for criterion, data in criteria_stats.items():
             if not data['scores']:
                 continue
@@ -740,13 +901,17 @@ class PerformanceAnalyzer:
                     percentages.append(score / max_score * 100)
             
             if percentages:
+                averages[criterion] = np.mean(percentages)
                 analysis[criterion] = {
-                    'average_percentage': round(np.mean(percentages), 1),
+                    'average_percentage': round(averages[criterion], 1),
                     'students_full_marks': len([p for p in percentages if p >= 99]),
-                    'students_struggled': len([p for p in percentages if p < 50]),
-                    'strength_level': self._get_strength_level(np.mean(percentages))
+                    'students_struggled': len([p for p in percentages if p < 50])
                 }
         
+        # Strength levels for all criteria in one lookup
+        for criterion, level in zip(averages, classify_strength(list(averages.values())).tolist()):
+            analysis[criterion]['strength_level'] = level
+        
         return analysis
     
     def identify_struggling_students(self, evaluations, threshold=60):
@@ -777,26 +942,4 @@ class PerformanceAnalyzer:
                 })
         
         top.sort(key=lambda x: x['percentage'], reverse=True)
-        return top
-    
-    def _calculate_difficulty(self, avg_percentage):
-        """Determine question difficulty"""
-        if avg_percentage >= 80:
-            return "Easy"
-        elif avg_percentage >= 60:
-            return "Moderate"
-        elif avg_percentage >= 40:
-            return "Hard"
-        else:
-            return "Very Hard"
-    
-    def _get_strength_level(self, avg_percentage):
-        """Determine class strength in criteria"""
-        if avg_percentage >= 80:
-            return "Strong"
-        elif avg_percentage >= 65:
-            return "Good"
-        elif avg_percentage >= 50:
-            return "Adequate"
-        else:
-            return "Weak"
\ No newline at end of file
+        return top
\ No newline at end of file
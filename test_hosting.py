@@ -7,21 +7,178 @@ import streamlit as st
 import pandas as pd
 import sqlite3
 import json
+import orjson
 import random
 import string
+import threading
+import time
+import csv
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 import io
+import html
+
+# Test codes: TEST-<year>-<4 chars> drawn from the OS RNG
+_CODE_ALPHABET = string.ascii_uppercase + string.digits
+_CODE_RNG = random.SystemRandom()
+_CODE_ATTEMPTS = 5
+
+# ===== SQL STATEMENTS =====
+# Built once; sqlite3's statement cache then reuses the prepared form for identical text
+
+# Status implied by the schedule at :now; computed on read, so nothing has to persist transitions
+_SQL_EFFECTIVE_STATUS = '''
+    CASE
+        WHEN status = 'active' AND closes_at IS NOT NULL AND closes_at <= :now THEN 'closed'
+        WHEN status = 'scheduled' AND starts_at <= :now THEN
+            CASE WHEN closes_at IS NOT NULL AND closes_at <= :now THEN 'closed' ELSE 'active' END
+        ELSE status
+    END
+'''
+_SQL_SUBMISSION_COUNT = '''
+    (SELECT COUNT(*) FROM online_submissions s WHERE s.test_code = t.test_code)
+'''
+_SQL_INSERT_TEST = '''
+    INSERT INTO online_tests
+    (test_code, title, subject, duration_minutes, rubric, questions,
+     starts_at, closes_at, status, teacher_notes)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+_SQL_GET_TEST = f'''
+    SELECT title, subject, duration_minutes AS duration, rubric, questions,
+           {_SQL_EFFECTIVE_STATUS} AS status,
+           starts_at, closes_at,
+           {_SQL_SUBMISSION_COUNT} AS total_submissions
+    FROM online_tests t
+    WHERE test_code = :test_code
+'''
+_SQL_SELECT_ALL_TESTS = f'''
+    SELECT test_code, title, subject,
+           {_SQL_SUBMISSION_COUNT} AS submissions,
+           created_at,
+           {_SQL_EFFECTIVE_STATUS} AS status,
+           starts_at, closes_at
+    FROM online_tests t
+    ORDER BY created_at DESC
+'''
+_SQL_CLOSE_TEST = "UPDATE online_tests SET status = 'closed', closes_at = ? WHERE test_code = ?"
+_SQL_ACTIVATE_TEST = "UPDATE online_tests SET status = 'active', starts_at = ? WHERE test_code = ?"
+_SQL_INSERT_SUBMISSION = '''
+    INSERT INTO online_submissions
+    (test_code, student_name, student_email, answers, time_taken_minutes)
+    VALUES (?, ?, ?, ?, ?)
+'''
+# LIMIT -1 means no limit
+_SQL_SELECT_SUBMISSIONS = '''
+    SELECT student_name, student_email, answers, submitted_at,
+           time_taken_minutes AS time_taken
+    FROM online_submissions
+    WHERE test_code = ?
+    ORDER BY submitted_at DESC
+    LIMIT ?
+'''
+_SQL_SELECT_SUBMISSION_SUMMARIES = '''
+    SELECT student_name, submitted_at
+    FROM online_submissions
+    WHERE test_code = ?
+    ORDER BY submitted_at DESC
+    LIMIT ?
+'''
+# Newest submissions of several tests at once; :codes is a JSON array, :limit NULL for all
+_SQL_SELECT_SUBMISSION_SUMMARIES_FOR_TESTS = '''
+    SELECT test_code, student_name, submitted_at
+    FROM (
+        SELECT test_code, student_name, submitted_at,
+               ROW_NUMBER() OVER (PARTITION BY test_code ORDER BY submitted_at DESC) AS rn
+        FROM online_submissions
+        WHERE test_code IN (SELECT value FROM json_each(:codes))
+    )
+    WHERE :limit IS NULL OR rn <= :limit
+    ORDER BY test_code, rn
+'''
+# Test and submissions in one query; the title repeats on every row
+_SQL_EXPORT_TEST = '''
+    SELECT t.title, s.student_name, s.answers
+    FROM online_tests t
+    LEFT JOIN online_submissions s ON s.test_code = t.test_code
+    WHERE t.test_code = ?
+    ORDER BY s.submitted_at DESC
+'''
+# Normalized copies of the rubric/questions JSON, for reads that only need these columns
+_SQL_INSERT_CRITERION = "INSERT INTO test_criteria (test_code, position, name, marks) VALUES (?, ?, ?, ?)"
+_SQL_INSERT_QUESTION = "INSERT INTO test_questions (test_code, number, text) VALUES (?, ?, ?)"
+_SQL_SELECT_CRITERIA = "SELECT name, marks FROM test_criteria WHERE test_code = ? ORDER BY position"
+_SQL_SELECT_QUESTIONS = "SELECT number, text FROM test_questions WHERE test_code = ? ORDER BY number"
+# Tests created before the child tables existed are split out of their JSON on startup
+_SQL_BACKFILL_CRITERIA = '''
+    INSERT INTO test_criteria (test_code, position, name, marks)
+    SELECT t.test_code, j.key, json_extract(j.value, '$.CRITERIA'),
+           json_extract(j.value, '$."TOTAL MARKS"')
+    FROM online_tests t, json_each(t.rubric) j
+    WHERE NOT EXISTS (SELECT 1 FROM test_criteria c WHERE c.test_code = t.test_code)
+'''
+_SQL_BACKFILL_QUESTIONS = '''
+    INSERT INTO test_questions (test_code, number, text)
+    SELECT t.test_code, json_extract(j.value, '$.number'), json_extract(j.value, '$.text')
+    FROM online_tests t, json_each(t.questions) j
+    WHERE NOT EXISTS (SELECT 1 FROM test_questions q WHERE q.test_code = t.test_code)
+'''
 
 class TestHosting:
+    # Connection PRAGMAs (applied once to the long-lived connection)
+    CONNECTION_PRAGMAS = (
+        "PRAGMA journal_mode=WAL",     # Persistent on the file; readers don't block writers
+        "PRAGMA synchronous=NORMAL",   # Safe with WAL, avoids an fsync per commit
+        "PRAGMA temp_store=MEMORY",
+        "PRAGMA mmap_size=268435456",  # 256MB memory-mapped I/O
+        "PRAGMA busy_timeout=5000",    # The API bridge writes submissions to the same file
+    )
+    # Submissions fetched per step while exporting a test to CSV
+    EXPORT_BATCH_SIZE = 5000
+    
     def __init__(self, db_path='rubriqai.db'):
         self.db_path = db_path
+        # One long-lived connection instead of an open/close per call; Streamlit may
+        # rerun a session on a different thread, so access is serialized by a lock
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        # Rows are addressable by column name, so results map straight to dicts
+        self._conn.row_factory = sqlite3.Row
+        # Parsed (rubric, questions) per test_code; neither column changes after create_test
+        self._content_cache = {}
+        for pragma in self.CONNECTION_PRAGMAS:
+            self._conn.execute(pragma)
         self.init_database()
     
+    @contextmanager
+    def get_connection(self):
+        """Context manager yielding the shared connection inside a write transaction"""
+        with self._lock:
+            conn = self._conn
+            # Every caller writes: take the write lock up front so a transaction never has to
+            # upgrade from a read lock while the API bridge is writing (which fails with SQLITE_BUSY)
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                if conn.in_transaction:
+                    conn.execute("COMMIT")
+            except Exception as e:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise e
+    
+    def close(self):
+        """Close the shared connection"""
+        with self._lock:
+            self._conn.close()
+    
     def init_database(self):
         """Initialize test hosting tables with scheduling"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
+        with self.get_connection() as conn:
+            self._create_tables(conn.cursor())
+    
+    def _create_tables(self, cursor):
+        """Create the online test tables if they don't exist"""
         # Online tests table with scheduling
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS online_tests (
@@ -55,22 +212,45 @@ class TestHosting:
             )
         ''')
         
-        conn.commit()
-        conn.close()
+        # Submission counts and get_submissions' ORDER BY are both served by this index
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_subs_testcode_time
+            ON online_submissions(test_code, submitted_at DESC)
+        ''')
+        cursor.execute('DROP INDEX IF EXISTS idx_subs_testcode')  # Superseded by the prefix above
+        
+        # Statuses are derived on read, so nothing filters on status plus a schedule column any more
+        cursor.execute('DROP INDEX IF EXISTS idx_tests_status_starts')
+        cursor.execute('DROP INDEX IF EXISTS idx_tests_status_closes')
+        
+        # Rubric and questions, one row each; the JSON columns are still written for older readers
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS test_criteria (
+                test_code TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                name TEXT,
+                marks INTEGER,
+                PRIMARY KEY (test_code, position)
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS test_questions (
+                test_code TEXT NOT NULL,
+                number INTEGER NOT NULL,
+                text TEXT,
+                PRIMARY KEY (test_code, number)
+            )
+        ''')
+        cursor.execute(_SQL_BACKFILL_CRITERIA)
+        cursor.execute(_SQL_BACKFILL_QUESTIONS)
     
     def generate_test_code(self):
-        """Generate unique test code"""
-        year = datetime.now().year
-        random_part = ''.join(random.choices(string.ascii_uppercase + string.digits, k=4))
-        return f"TEST-{year}-{random_part}"
+        """Generate a test code (unique in practice; create_test retries on a collision)"""
+        random_part = ''.join(_CODE_RNG.choices(_CODE_ALPHABET, k=4))
+        return f"TEST-{datetime.now().year}-{random_part}"
     
     def create_test(self, title, subject, duration, rubric_df, questions_list, starts_at=None, closes_at=None, teacher_notes=''):
         """Create a new online test with scheduling"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        test_code = self.generate_test_code()
-        
         # Convert rubric to dict
         rubric = rubric_df.to_dict('records')
         
@@ -91,230 +271,216 @@ class TestHosting:
         else:
             status = 'active'
         
-        cursor.execute('''
-            INSERT INTO online_tests 
-            (test_code, title, subject, duration_minutes, rubric, questions, 
-             starts_at, closes_at, status, teacher_notes)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            test_code,
-            title,
-            subject,
-            duration,
-            json.dumps(rubric),
-            json.dumps(questions),
-            starts_at.isoformat() if starts_at else None,
-            closes_at.isoformat() if closes_at else None,
-            status,
-            teacher_notes
-        ))
-        
-        conn.commit()
-        conn.close()
+        # 36^4 codes per year: a collision is rare but possible, so retry with a fresh code
+        for attempt in range(_CODE_ATTEMPTS):
+            test_code = self.generate_test_code()
+            try:
+                with self.get_connection() as conn:
+                    conn.execute(_SQL_INSERT_TEST, (
+                        test_code,
+                        title,
+                        subject,
+                        duration,
+                        orjson.dumps(rubric).decode('utf-8'),
+                        orjson.dumps(questions).decode('utf-8'),
+                        starts_at.isoformat() if starts_at else None,
+                        closes_at.isoformat() if closes_at else None,
+                        status,
+                        teacher_notes
+                    ))
+                    conn.executemany(_SQL_INSERT_CRITERION, (
+                        (test_code, position, criterion.get('CRITERIA'), criterion.get('TOTAL MARKS'))
+                        for position, criterion in enumerate(rubric)
+                    ))
+                    conn.executemany(_SQL_INSERT_QUESTION, (
+                        (test_code, q['number'], q['text']) for q in questions
+                    ))
+                break
+            except sqlite3.IntegrityError:
+                if attempt == _CODE_ATTEMPTS - 1:
+                    raise
+        _cached_tests.clear()
         
         return test_code
     
     def get_test(self, test_code):
         """Retrieve test by code"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT title, subject, duration_minutes, rubric, questions, 
-                   status, starts_at, closes_at, total_submissions
-            FROM online_tests
-            WHERE test_code = ?
-        ''', (test_code,))
-        
-        row = cursor.fetchone()
-        conn.close()
+        with self._lock:
+            row = self._conn.execute(
+                _SQL_GET_TEST, {'now': datetime.now().isoformat(), 'test_code': test_code}
+            ).fetchone()
         
         if row:
-            return {
-                'title': row[0],
-                'subject': row[1],
-                'duration': row[2],
-                'rubric': json.loads(row[3]),
-                'questions': json.loads(row[4]),
-                'status': row[5],
-                'starts_at': row[6],
-                'closes_at': row[7],
-                'total_submissions': row[8]
-            }
+            test = dict(row)
+            test['rubric'], test['questions'] = self._parse_content(test_code, row['rubric'], row['questions'])
+            return test
         return None
     
-    def update_test_status(self):
-        """Update test statuses based on current time"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        now = datetime.now().isoformat()
-        
-        # Set scheduled tests to active if start time passed
-        cursor.execute('''
-            UPDATE online_tests
-            SET status = 'active'
-            WHERE status = 'scheduled' AND starts_at <= ?
-        ''', (now,))
-        
-        # Set active tests to closed if end time passed
-        cursor.execute('''
-            UPDATE online_tests
-            SET status = 'closed'
-            WHERE status = 'active' AND closes_at <= ? AND closes_at IS NOT NULL
-        ''', (now,))
-        
-        conn.commit()
-        conn.close()
+    def _parse_content(self, test_code, rubric_json, questions_json):
+        """Decoded (rubric, questions) for a test, parsed once per instance; callers must not mutate them"""
+        content = self._content_cache.get(test_code)
+        if content is None:
+            content = (orjson.loads(rubric_json), orjson.loads(questions_json))
+            self._content_cache[test_code] = content
+        return content
     
     def submit_answers(self, test_code, student_name, student_email, answers, time_taken):
         """Student submits answers"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO online_submissions
-            (test_code, student_name, student_email, answers, time_taken_minutes)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (
-            test_code,
-            student_name,
-            student_email or '',
-            json.dumps(answers),
-            time_taken
-        ))
-        
-        # Update submission count
-        cursor.execute('''
-            UPDATE online_tests
-            SET total_submissions = total_submissions + 1
-            WHERE test_code = ?
-        ''', (test_code,))
-        
-        conn.commit()
-        conn.close()
+        self.submit_answers_bulk([(test_code, student_name, student_email, answers, time_taken)])
     
-    def get_submissions(self, test_code):
-        """Get all submissions for a test"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT student_name, student_email, answers, submitted_at, time_taken_minutes
-            FROM online_submissions
-            WHERE test_code = ?
-            ORDER BY submitted_at DESC
-        ''', (test_code,))
-        
-        rows = cursor.fetchall()
-        conn.close()
+    def submit_answers_bulk(self, submissions):
+        """Store several submissions in one transaction
+        
+        Args:
+            submissions: Iterable of (test_code, student_name, student_email, answers, time_taken)
+        """
+        with self.get_connection() as conn:
+            conn.executemany(_SQL_INSERT_SUBMISSION, (
+                (
+                    test_code,
+                    student_name,
+                    student_email or '',
+                    orjson.dumps(answers).decode('utf-8'),
+                    time_taken
+                )
+                for test_code, student_name, student_email, answers, time_taken in submissions
+            ))
+        _cached_tests.clear()
+    
+    def get_submissions(self, test_code, limit=None):
+        """Get submissions for a test, newest first (all of them unless limit is given)"""
+        with self._lock:
+            rows = self._conn.execute(
+                _SQL_SELECT_SUBMISSIONS, (test_code, -1 if limit is None else limit)
+            ).fetchall()
+        
+        return [{**row, 'answers': orjson.loads(row['answers'])} for row in rows]
+    
+    def get_submission_summaries(self, test_code, limit=5):
+        """Names and times of the newest submissions, without parsing their answers"""
+        with self._lock:
+            rows = self._conn.execute(
+                _SQL_SELECT_SUBMISSION_SUMMARIES, (test_code, -1 if limit is None else limit)
+            ).fetchall()
+        
+        return [dict(row) for row in rows]
+    
+    def get_recent_submissions_for_tests(self, test_codes, limit_per=5):
+        """Submission summaries for several tests from one query
         
-        submissions = []
+        Args:
+            test_codes: Tests to look up
+            limit_per: Newest submissions to keep per test (None for all)
+            
+        Returns:
+            dict: {test_code: [{'student_name', 'submitted_at'}, ...]}, newest first
+        """
+        with self._lock:
+            rows = self._conn.execute(_SQL_SELECT_SUBMISSION_SUMMARIES_FOR_TESTS, {
+                'codes': orjson.dumps(list(test_codes)).decode('utf-8'),
+                'limit': limit_per
+            }).fetchall()
+        
+        summaries = {code: [] for code in test_codes}
         for row in rows:
-            submissions.append({
-                'student_name': row[0],
-                'student_email': row[1],
-                'answers': json.loads(row[2]),
-                'submitted_at': row[3],
-                'time_taken': row[4]
-            })
-        
-        return submissions
+            summaries[row['test_code']].append({'student_name': row['student_name'], 'submitted_at': row['submitted_at']})
+        return summaries
     
     def export_to_csv(self, test_code):
         """Export test + submissions to CSV format for RubriqAI"""
-        test = self.get_test(test_code)
-        if not test:
-            return None
-        
-        submissions = self.get_submissions(test_code)
-        
-        csv_lines = []
-        
-        # CRITERIA section
-        csv_lines.append("CRITERIA,TOTAL MARKS")
-        for criterion in test['rubric']:
-            csv_lines.append(f"{criterion['CRITERIA']},{criterion['TOTAL MARKS']}")
-        
-        # QUESTIONS section
-        csv_lines.append("QUESTIONS,")
-        for q in test['questions']:
-            question_text = q['text'].replace('"', '""')
-            csv_lines.append(f'{q["number"]},"{question_text}"')
-        
-        # STUDENTS section
-        csv_lines.append("STUDENTS,")
-        for sub in submissions:
-            student_name = sub['student_name']
-            answer_values = []
-            for q in test['questions']:
-                answer = sub['answers'].get(str(q['number']), '')
-                answer = answer.replace('"', '""')
-                answer_values.append(f'"{answer}"')
+        # csv.writer handles quoting; the import side reads it back with csv.reader
+        buf = io.StringIO()
+        writer = csv.writer(buf, lineterminator='\n')
+        
+        with self._lock:
+            cursor = self._conn.execute(_SQL_EXPORT_TEST, (test_code,))
+            first = cursor.fetchone()
+            if first is None:
+                return None
+            criteria = self._conn.execute(_SQL_SELECT_CRITERIA, (test_code,)).fetchall()
+            questions = self._conn.execute(_SQL_SELECT_QUESTIONS, (test_code,)).fetchall()
             
-            csv_lines.append(f"{student_name}," + ",".join(answer_values))
-        
-        csv_content = "\n".join(csv_lines)
-        return csv_content, test['title']
+            # CRITERIA section
+            writer.writerow(["CRITERIA", "TOTAL MARKS"])
+            writer.writerows(criteria)
+            
+            # QUESTIONS section
+            writer.writerow(["QUESTIONS", ""])
+            writer.writerows(questions)
+            
+            # STUDENTS section, read in batches so only one batch of rows is held besides the output
+            # (a test without submissions comes back as one row of NULLs)
+            writer.writerow(["STUDENTS", ""])
+            question_keys = [str(q['number']) for q in questions]
+            batch = [first]
+            while batch:
+                for row in batch:
+                    if row['student_name'] is None:
+                        continue
+                    get_answer = orjson.loads(row['answers']).get
+                    writer.writerow([row['student_name'], *[get_answer(key, '') for key in question_keys]])
+                batch = cursor.fetchmany(self.EXPORT_BATCH_SIZE)
+        
+        return buf.getvalue(), first['title']
     
     def get_all_tests(self):
         """Get all tests created"""
-        self.update_test_status()  # Update statuses first
-        
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT test_code, title, subject, total_submissions, 
-                   created_at, status, starts_at, closes_at
-            FROM online_tests
-            ORDER BY created_at DESC
-        ''')
+        with self._lock:
+            rows = self._conn.execute(
+                _SQL_SELECT_ALL_TESTS, {'now': datetime.now().isoformat()}
+            ).fetchall()
         
-        rows = cursor.fetchall()
-        conn.close()
-        
-        tests = []
-        for row in rows:
-            tests.append({
-                'test_code': row[0],
-                'title': row[1],
-                'subject': row[2],
-                'submissions': row[3],
-                'created_at': row[4],
-                'status': row[5],
-                'starts_at': row[6],
-                'closes_at': row[7]
-            })
-        
-        return tests
+        # Plain dicts rather than Rows: the list is pickled by st.cache_data
+        return [dict(row) for row in rows]
     
     def manually_close_test(self, test_code):
         """Manually close test"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            UPDATE online_tests
-            SET status = 'closed', closes_at = ?
-            WHERE test_code = ?
-        ''', (datetime.now().isoformat(), test_code))
-        
-        conn.commit()
-        conn.close()
+        with self.get_connection() as conn:
+            conn.execute(_SQL_CLOSE_TEST, (datetime.now().isoformat(), test_code))
+        _cached_tests.clear()
     
     def activate_test(self, test_code):
         """Manually activate a test"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            UPDATE online_tests
-            SET status = 'active', starts_at = ?
-            WHERE test_code = ?
-        ''', (datetime.now().isoformat(), test_code))
-        
-        conn.commit()
-        conn.close()
+        with self.get_connection() as conn:
+            conn.execute(_SQL_ACTIVATE_TEST, (datetime.now().isoformat(), test_code))
+        _cached_tests.clear()
+
+
+def _fragment(func=None, *, run_every=None):
+    """st.fragment where Streamlit has it (1.37+); older releases rerun the whole page and never auto-refresh"""
+    if not hasattr(st, "fragment"):
+        return func if func is not None else (lambda f: f)
+    return st.fragment(func, run_every=run_every)
+
+
+def _rubric_is_valid(rubric_df):
+    """True when the rubric has at least one row and every criterion is named"""
+    criteria = rubric_df['CRITERIA'].to_numpy()
+    return criteria.size > 0 and not (pd.isna(criteria) | (criteria == '')).any()
+
+
+@st.cache_resource(show_spinner=False)
+def get_hosting():
+    """TestHosting shared by every session; its connection is lock-guarded, so one instance serves all reruns"""
+    return TestHosting()
+
+
+@st.cache_data(ttl=5, show_spinner=False)
+def _cached_tests():
+    """All tests, shared across reruns; cleared whenever a test or submission changes"""
+    return get_hosting().get_all_tests()
+
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def _cached_submission_summaries(test_counts):
+    """{test_code: submissions} for every listed test; test_counts ((code, count), ...) is also the cache key"""
+    return get_hosting().get_recent_submissions_for_tests([code for code, _ in test_counts], limit_per=None)
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def _cached_export(test_code, submission_count):
+    """(csv_content, title) for a test; submission_count is only a cache key, so a new submission rebuilds it"""
+    return get_hosting().export_to_csv(test_code)
 
 
 # Streamlit UI Components
@@ -323,7 +489,7 @@ def render_teacher_test_creator():
     """UI for teachers to create online tests with scheduling - FIXED DYNAMIC QUESTIONS"""
     st.subheader("📝 Create Online Test")
     
-    hosting = TestHosting()
+    hosting = get_hosting()
     
     # ═════════════════════════════════════════════════════════════
     # ✅ FIX: Number of questions OUTSIDE form for immediate update
@@ -427,7 +593,7 @@ def render_teacher_test_creator():
                 st.error(f"❌ Please fill in at least one question!")
             elif len(questions) < num_questions:
                 st.warning(f"⚠️ You selected {num_questions} questions but only filled {len(questions)}. Please fill all {num_questions} question boxes!")
-            elif rubric_df.empty or rubric_df['CRITERIA'].isna().any():
+            elif not _rubric_is_valid(rubric_df):
                 st.error("❌ Please set up a valid rubric!")
             elif schedule_test and closes_at and closes_at <= starts_at:
                 st.error("❌ End time must be after start time!")
@@ -472,8 +638,8 @@ def render_teacher_test_manager():
     """UI for teachers to manage tests"""
     st.subheader("📊 Manage Online Tests")
     
-    hosting = TestHosting()
-    tests = hosting.get_all_tests()
+    hosting = get_hosting()
+    tests = _cached_tests()
     
     if not tests:
         st.info("📝 No tests created yet. Go to 'Create Test' tab to make your first test!")
@@ -533,7 +699,7 @@ def render_teacher_test_manager():
             with col_a:
                 if test['submissions'] > 0:
                     if st.button("📥 CSV", key=f"dl_{test['test_code']}", use_container_width=True):
-                        csv_content, title = hosting.export_to_csv(test['test_code'])
+                        csv_content, title = _cached_export(test['test_code'], test['submissions'])
                         
                         st.download_button(
                             label="💾 Download",
@@ -546,14 +712,14 @@ def render_teacher_test_manager():
             
             with col_b:
                 if st.button("👥 View", key=f"view_{test['test_code']}", use_container_width=True):
-                    submissions = hosting.get_submissions(test['test_code'])
+                    submissions = hosting.get_submission_summaries(test['test_code'])
                     
                     if submissions:
                         st.write("**Recent Submissions:**")
-                        for i, sub in enumerate(submissions[:5], 1):
+                        for i, sub in enumerate(submissions, 1):
                             st.caption(f"{i}. {sub['student_name']} - {sub['submitted_at']}")
-                        if len(submissions) > 5:
-                            st.caption(f"... and {len(submissions) - 5} more")
+                        if test['submissions'] > 5:
+                            st.caption(f"... and {test['submissions'] - 5} more")
                     else:
                         st.info("No submissions yet")
             
@@ -577,12 +743,17 @@ def render_teacher_test_manager():
 
 def render_right_sidebar():
     """Render right sidebar with live test info"""
-    hosting = TestHosting()
-    tests = hosting.get_all_tests()
+    tests = _cached_tests()  # Shared with the test manager; usually served without touching the DB
     
-    # Get active and scheduled tests
-    active_tests = [t for t in tests if t['status'] == 'active']
-    scheduled_tests = [t for t in tests if t['status'] == 'scheduled']
+    # Active and scheduled tests plus the submission total, in one pass over the list
+    active_tests, scheduled_tests = [], []
+    total_submissions = 0
+    for t in tests:
+        total_submissions += t['submissions']
+        if t['status'] == 'active':
+            active_tests.append(t)
+        elif t['status'] == 'scheduled':
+            scheduled_tests.append(t)
     
     st.markdown("### 📊 Live Tests")
     
@@ -614,7 +785,6 @@ def render_right_sidebar():
     
     # Quick stats
     st.markdown("### 📈 Stats")
-    total_submissions = sum(t['submissions'] for t in tests)
     st.metric("Total Submissions", total_submissions)
     st.metric("Total Tests", len(tests))
 
@@ -867,7 +1037,7 @@ def render_teacher_test_creator():
     st.subheader("📝 Create Online Test")
     st.info("💡 Create a test, get a code, students take it online, you get automatic CSV!")
     
-    hosting = TestHosting()
+    hosting = get_hosting()
     
     with st.form("create_test_form"):
         title = st.text_input("Test Title", placeholder="Biology Midterm Exam")
@@ -909,7 +1079,7 @@ def render_teacher_test_creator():
         if submitted:
             if not title or not questions:
                 st.error("Please enter title and at least one question!")
-            elif rubric_df.empty or rubric_df['CRITERIA'].isna().any():
+            elif not _rubric_is_valid(rubric_df):
                 st.error("Please set up a valid rubric!")
             else:
                 try:
@@ -934,8 +1104,7 @@ def render_teacher_test_manager():
     """UI for teachers to manage and download submissions"""
     st.subheader("📊 Manage Online Tests")
     
-    hosting = TestHosting()
-    tests = hosting.get_all_tests()
+    tests = _cached_tests()
     
     if not tests:
         st.info("📝 No tests created yet. Create your first test above!")
@@ -943,66 +1112,97 @@ def render_teacher_test_manager():
     
     st.write(f"**You have {len(tests)} test(s):**")
     
+    # Opening any test's submissions loads every test's list in one query, cached until a count changes
+    test_counts = tuple((t['test_code'], t['submissions']) for t in tests)
     for test in tests:
-        with st.expander(f"📋 {test['title']} ({test['test_code']}) - {test['submissions']} submissions"):
-            col1, col2, col3 = st.columns(3)
-            
-            with col1:
-                st.metric("Code", test['test_code'])
-            with col2:
-                st.metric("Submissions", test['submissions'])
-            with col3:
-                status_emoji = "🟢" if test['status'] == 'active' else "🔴"
-                st.metric("Status", f"{status_emoji} {test['status'].title()}")
-            
-            st.caption(f"Created: {test['created_at']} • Subject: {test['subject'] or 'N/A'}")
-            
-            # Action buttons
-            col_a, col_b, col_c = st.columns(3)
-            
-            with col_a:
-                if test['submissions'] > 0:
-                    csv_content, title = hosting.export_to_csv(test['test_code'])
-                    
-                    if csv_content:
-                        st.download_button(
-                            label="📥 CSV",
-                            data=csv_content,
-                            file_name=f"{title.replace(' ', '_')}_submissions.csv",
-                            mime="text/csv",
-                            key=f"dlbtn_{test['test_code']}",
-                            use_container_width=True
-                        )
-            
-            with col_b:
-                if st.button("👥 View Submissions", key=f"view_{test['test_code']}"):
-                    submissions = hosting.get_submissions(test['test_code'])
+        _render_test_row(test, test_counts)
+
+
+def _test_summary_html(test):
+    """Code, submissions, status and created/subject line of a test as one read-only card"""
+    status_emoji = "🟢" if test['status'] == 'active' else "🔴"
+    stats = (
+        ("Code", html.escape(test['test_code'])),
+        ("Submissions", test['submissions']),
+        ("Status", f"{status_emoji} {html.escape(test['status'].title())}"),
+    )
+    stats_html = "".join(
+        f"<div style='flex: 1;'>"
+        f"<p style='font-size: 0.875rem; color: #9CA3AF; margin: 0;'>{label}</p>"
+        f"<p style='font-size: 1.75rem; color: #F9FAFB; margin: 0;'>{value}</p>"
+        f"</div>"
+        for label, value in stats
+    )
+    return (
+        f"<div style='display: flex; gap: 1rem; margin-bottom: 0.5rem;'>{stats_html}</div>"
+        f"<p style='font-size: 0.875rem; color: #9CA3AF; margin: 0 0 1rem 0;'>"
+        f"Created: {html.escape(str(test['created_at']))} • Subject: {html.escape(test['subject'] or 'N/A')}</p>"
+    )
+
+
+@_fragment
+def _render_test_row(test, test_counts):
+    """One test's expander; its buttons rerun only this row unless they change the test list"""
+    hosting = get_hosting()
+    
+    with st.expander(f"📋 {test['title']} ({test['test_code']}) - {test['submissions']} submissions"):
+        st.markdown(_test_summary_html(test), unsafe_allow_html=True)
+        
+        # Action buttons
+        col_a, col_b, col_c = st.columns(3)
+        
+        with col_a:
+            # The CSV is only built once the teacher asks for it, not on every rerun of the page
+            if test['submissions'] > 0:
+                if st.button("📥 CSV", key=f"dl_{test['test_code']}", use_container_width=True):
+                    csv_content, title = _cached_export(test['test_code'], test['submissions'])
                     
-                    if submissions:
-                        st.write("**Submissions:**")
-                        for i, sub in enumerate(submissions, 1):
-                            st.write(f"{i}. {sub['student_name']} - {sub['submitted_at']}")
-                    else:
-                        st.info("No submissions yet")
-            
-            with col_c:
-                if test['status'] == 'active':
-                    if st.button("🔒 Close", key=f"close_{test['test_code']}", use_container_width=True):
-                        hosting.manually_close_test(test['test_code'])
-                        st.success("Test closed!")
-                        st.rerun()
-                elif test['status'] == 'scheduled':
-                    if st.button("▶️ Start Now", key=f"start_{test['test_code']}", use_container_width=True):
-                        hosting.activate_test(test['test_code'])
-                        st.success("Test activated!")
-                        st.rerun()
+                    st.download_button(
+                        label="💾 Download",
+                        data=csv_content,
+                        file_name=f"{title.replace(' ', '_')}_submissions.csv",
+                        mime="text/csv",
+                        key=f"dlbtn_{test['test_code']}",
+                        use_container_width=True
+                    )
+        
+        with col_b:
+            if st.button("👥 View Submissions", key=f"view_{test['test_code']}"):
+                submissions = _cached_submission_summaries(test_counts)[test['test_code']]
+                
+                if submissions:
+                    st.write("**Submissions:**")
+                    # One table element however many students submitted
+                    st.dataframe(
+                        pd.DataFrame({
+                            '#': range(1, len(submissions) + 1),
+                            'Student': [sub['student_name'] for sub in submissions],
+                            'Submitted': [sub['submitted_at'] for sub in submissions]
+                        }),
+                        hide_index=True,
+                        use_container_width=True
+                    )
+                else:
+                    st.info("No submissions yet")
+        
+        with col_c:
+            if test['status'] == 'active':
+                if st.button("🔒 Close", key=f"close_{test['test_code']}", use_container_width=True):
+                    hosting.manually_close_test(test['test_code'])
+                    st.success("Test closed!")
+                    st.rerun()
+            elif test['status'] == 'scheduled':
+                if st.button("▶️ Start Now", key=f"start_{test['test_code']}", use_container_width=True):
+                    hosting.activate_test(test['test_code'])
+                    st.success("Test activated!")
+                    st.rerun()
 
 
 def render_student_test_interface():
     """UI for students to take tests"""
     st.subheader("🎓 Student: Take Test")
     
-    hosting = TestHosting()
+    hosting = get_hosting()
     
     # Step 1: Enter test code
     if 'test_loaded' not in st.session_state:
@@ -1064,7 +1264,7 @@ def render_student_test_interface():
                 st.session_state.student_email = student_email
                 st.session_state.test_started = True
                 st.session_state.start_time = datetime.now()
-                st.session_state.test_answers = {}
+                st.session_state.start_monotonic = time.monotonic()
                 st.rerun()
             else:
                 st.error("Please enter your name")
@@ -1075,9 +1275,54 @@ def render_student_test_interface():
     st.success(f"📝 Taking: **{test['title']}**")
     st.caption(f"Student: {st.session_state.student_name}")
     
-    # Timer
-    elapsed = (datetime.now() - st.session_state.start_time).seconds // 60
-    remaining = test['duration'] - elapsed
+    _render_timer()
+    
+    st.markdown("---")
+    
+    # Questions, in a form so typing an answer doesn't rerun the page; answers are read on submit
+    with st.form("take_test", clear_on_submit=False):
+        for q in test['questions']:
+            st.write(f"**Question {q['number']}:**")
+            st.write(q['text'])
+            
+            st.text_area(
+                "Your answer:",
+                key=f"answer_{q['number']}",
+                height=150,
+                placeholder="Type your answer here..."
+            )
+            
+            st.markdown("---")
+        
+        # Submit
+        col1, col2, col3 = st.columns([1, 1, 1])
+        with col2:
+            submitted = st.form_submit_button("✅ Submit Test", type="primary", use_container_width=True)
+    
+    if submitted:
+        # Check if all questions answered (each text area keeps its value under its own key)
+        unanswered = [
+            q['number'] for q in test['questions'] 
+            if not st.session_state.get(f"answer_{q['number']}", '').strip()
+        ]
+        
+        if unanswered:
+            st.warning(f"⚠️ Questions {', '.join(map(str, unanswered))} are empty. Submit anyway?")
+            if st.button("Yes, Submit", type="secondary"):
+                submit_test(hosting)
+        else:
+            submit_test(hosting)
+
+
+def _elapsed_minutes():
+    """Whole minutes since the student started; monotonic, so wall-clock changes don't move the timer"""
+    return int((time.monotonic() - st.session_state.start_monotonic) // 60)
+
+
+@_fragment(run_every="30s")
+def _render_timer():
+    """Remaining time for the current test; refreshes on its own without rerunning the questions"""
+    remaining = st.session_state.current_test['duration'] - _elapsed_minutes()
     
     if remaining > 0:
         col1, col2 = st.columns([4, 1])
@@ -1086,51 +1331,23 @@ def render_student_test_interface():
                 st.error(f"⏰ {remaining} min left")
             else:
                 st.info(f"⏰ {remaining} min left")
-    
-    st.markdown("---")
-    
-    # Questions
-    for q in test['questions']:
-        st.write(f"**Question {q['number']}:**")
-        st.write(q['text'])
-        
-        answer = st.text_area(
-            "Your answer:",
-            key=f"answer_{q['number']}",
-            height=150,
-            placeholder="Type your answer here..."
-        )
-        
-        st.session_state.test_answers[str(q['number'])] = answer
-        st.markdown("---")
-    
-    # Submit
-    col1, col2, col3 = st.columns([1, 1, 1])
-    with col2:
-        if st.button("✅ Submit Test", type="primary", use_container_width=True):
-            # Check if all questions answered
-            unanswered = [
-                q['number'] for q in test['questions'] 
-                if not st.session_state.test_answers.get(str(q['number']), '').strip()
-            ]
-            
-            if unanswered:
-                st.warning(f"⚠️ Questions {', '.join(map(str, unanswered))} are empty. Submit anyway?")
-                if st.button("Yes, Submit", type="secondary"):
-                    submit_test(hosting)
-            else:
-                submit_test(hosting)
 
 
 def submit_test(hosting):
     """Handle test submission"""
-    time_taken = (datetime.now() - st.session_state.start_time).seconds // 60
+    time_taken = _elapsed_minutes()
+    
+    # Answers are collected from the text areas once, at submit time
+    answers = {
+        str(q['number']): st.session_state.get(f"answer_{q['number']}", '')
+        for q in st.session_state.current_test['questions']
+    }
     
     hosting.submit_answers(
         st.session_state.current_test_code,
         st.session_state.student_name,
         st.session_state.student_email,
-        st.session_state.test_answers,
+        answers,
         time_taken
     )
     
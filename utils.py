@@ -4,6 +4,40 @@ Helper functions for score calculations and performance metrics.
 """
 
 import re
+from bisect import bisect_right
+from enum import IntEnum
+
+import numpy as np
+
+# Integers and decimals, optionally negative; a trailing "." is left out of the match
+_NUMBER_RE = re.compile(r'-?\d+(?:\.\d+)?')
+
+# From this many student values, match by nearest neighbour in sorted order instead of a full distance matrix
+_SORTED_MATCH_MIN_VALUES = 8
+
+
+class PerformanceBucket(IntEnum):
+    """Performance band; the value indexes the _PERFORMANCE_* tuples"""
+    POOR = 0
+    BELOW_AVERAGE = 1
+    AVERAGE = 2
+    GOOD = 3
+    EXCELLENT = 4
+    
+    @property
+    def label(self) -> str:
+        """Display label (Poor/Below Average/Average/Good/Excellent)"""
+        return _PERFORMANCE_LABELS[self]
+
+
+# Performance bands: a percentage at or above _PERFORMANCE_THRESHOLDS[i] falls in PerformanceBucket(i + 1)
+_PERFORMANCE_THRESHOLDS = (40, 60, 75, 90)
+_PERFORMANCE_BUCKETS = tuple(PerformanceBucket)
+_PERFORMANCE_LABELS = ("Poor", "Below Average", "Average", "Good", "Excellent")
+_PERFORMANCE_COLORS = ("red", "red", "orange", "blue", "green")
+_PERFORMANCE_EMOJIS = ("❌", "⚠️", "👍", "✅", "🌟")
+# Legacy string labels accepted by get_performance_color / get_performance_emoji
+_LABEL_TO_BUCKET = dict(zip(_PERFORMANCE_LABELS, _PERFORMANCE_BUCKETS))
 
 
 def calculate_percentage(score: float, max_score: float) -> float:
@@ -32,10 +66,7 @@ def extract_numerical_answer(text: str) -> list:
     Returns:
         list: List of numbers found in text
     """
-    # Match integers and decimals (including negative)
-    pattern = r'-?\d+\.?\d*'
-    matches = re.findall(pattern, text)
-    return [float(m) for m in matches if m]
+    return list(map(float, _NUMBER_RE.findall(text)))
 
 
 def validate_mathematical_answer(student_answer: str, correct_answer: str, tolerance: float = 0.001) -> dict:
@@ -50,10 +81,17 @@ def validate_mathematical_answer(student_answer: str, correct_answer: str, toler
     Returns:
         dict: {is_exact_match: bool, student_values: list, expected_values: list}
     """
-    student_nums = extract_numerical_answer(student_answer)
     correct_nums = extract_numerical_answer(correct_answer)
+    if not correct_nums:
+        # Nothing to check against (essay-style answer); skip scanning the student's text
+        return {
+            'is_exact_match': None,
+            'student_values': [],
+            'expected_values': correct_nums
+        }
     
-    if not student_nums or not correct_nums:
+    student_nums = extract_numerical_answer(student_answer)
+    if not student_nums:
         return {
             'is_exact_match': None,  # Can't validate, no numbers found
             'student_values': student_nums,
@@ -61,16 +99,18 @@ def validate_mathematical_answer(student_answer: str, correct_answer: str, toler
         }
     
     # Check if all expected numbers are present in student answer
-    is_match = True
-    for expected in correct_nums:
-        found = False
-        for student in student_nums:
-            if abs(student - expected) <= tolerance:
-                found = True
-                break
-        if not found:
-            is_match = False
-            break
+    expected = np.asarray(correct_nums)
+    student = np.asarray(student_nums)
+    with np.errstate(invalid='ignore'):  # inf - inf (overlong digit strings) is NaN, i.e. no match, as before
+        if len(student) < _SORTED_MATCH_MIN_VALUES:
+            # Every row of the expected x student distance matrix needs one value within tolerance
+            is_match = bool(np.all(np.any(np.abs(student[None, :] - expected[:, None]) <= tolerance, axis=1)))
+        else:
+            # The closest student value to each expected one is next to its insertion point
+            student = np.sort(student)
+            idx = np.clip(np.searchsorted(student, expected), 1, len(student) - 1)
+            nearest = np.minimum(np.abs(student[idx] - expected), np.abs(student[idx - 1] - expected))
+            is_match = bool(np.all(nearest <= tolerance))
     
     return {
         'is_exact_match': is_match,
@@ -79,6 +119,21 @@ def validate_mathematical_answer(student_answer: str, correct_answer: str, toler
     }
 
 
+def get_performance_bucket(percentage: float) -> PerformanceBucket:
+    """
+    Determine performance band based on percentage.
+    
+    Args:
+        percentage: Score percentage (0-100)
+        
+    Returns:
+        PerformanceBucket: Band the percentage falls in
+    """
+    if percentage != percentage:  # NaN compares below every threshold
+        return PerformanceBucket.POOR
+    return _PERFORMANCE_BUCKETS[bisect_right(_PERFORMANCE_THRESHOLDS, percentage)]
+
+
 def get_performance_label(percentage: float) -> str:
     """
     Determine performance label based on percentage.
@@ -89,36 +144,23 @@ def get_performance_label(percentage: float) -> str:
     Returns:
         str: Performance label (Poor/Below Average/Average/Good/Excellent)
     """
-    if percentage >= 90:
-        return "Excellent"
-    elif percentage >= 75:
-        return "Good"
-    elif percentage >= 60:
-        return "Average"
-    elif percentage >= 40:
-        return "Below Average"
-    else:
-        return "Poor"
+    return _PERFORMANCE_LABELS[get_performance_bucket(percentage)]
 
 
-def get_performance_color(label: str) -> str:
+def get_performance_color(label) -> str:
     """
     Get color code for performance label (for progress bars/UI).
     
     Args:
-        label: Performance label
+        label: PerformanceBucket, or a performance label string
         
     Returns:
         str: Color name for Streamlit
     """
-    colors = {
-        "Excellent": "green",
-        "Good": "blue",
-        "Average": "orange",
-        "Below Average": "red",
-        "Poor": "red"
-    }
-    return colors.get(label, "gray")
+    if isinstance(label, PerformanceBucket):
+        return _PERFORMANCE_COLORS[label]
+    bucket = _LABEL_TO_BUCKET.get(label)
+    return "gray" if bucket is None else _PERFORMANCE_COLORS[bucket]
 
 
 def calculate_total_score(scores: list) -> dict:
@@ -131,8 +173,11 @@ def calculate_total_score(scores: list) -> dict:
     Returns:
         dict: {"total": awarded_total, "max": max_total}
     """
-    total = sum(item.get('awarded', 0) for item in scores)
-    max_total = sum(item.get('max', 0) for item in scores)
+    # One pass accumulating both sums
+    total = max_total = 0
+    for item in scores:
+        total += item.get('awarded', 0)
+        max_total += item.get('max', 0)
     
     return {
         "total": total,
@@ -157,21 +202,17 @@ def format_score_display(score: float, max_score: float) -> str:
     return f"{score}/{max_score}"
 
 
-def get_performance_emoji(label: str) -> str:
+def get_performance_emoji(label) -> str:
     """
     Get emoji for performance label.
     
     Args:
-        label: Performance label
+        label: PerformanceBucket, or a performance label string
         
     Returns:
         str: Emoji representation
     """
-    emojis = {
-        "Excellent": "🌟",
-        "Good": "✅",
-        "Average": "👍",
-        "Below Average": "⚠️",
-        "Poor": "❌"
-    }
-    return emojis.get(label, "📊")
+    if isinstance(label, PerformanceBucket):
+        return _PERFORMANCE_EMOJIS[label]
+    bucket = _LABEL_TO_BUCKET.get(label)
+    return "📊" if bucket is None else _PERFORMANCE_EMOJIS[bucket]